@@ -0,0 +1,30 @@
+"""trades market index
+
+Revision ID: 3f1c9d27a4e0
+Revises: af6b2aa1225b
+Create Date: 2026-10-18 10:12:31.482113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9d27a4e0'
+down_revision = 'af6b2aa1225b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'idx_trades_market_timestamp',
+        'trades',
+        ['market', 'timestamp', 'order_type', 'rate', 'quantity'],
+        unique=False
+    )
+    op.execute('ANALYZE trades')
+
+
+def downgrade():
+    op.drop_index('idx_trades_market_timestamp', table_name='trades')
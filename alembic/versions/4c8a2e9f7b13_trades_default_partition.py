@@ -0,0 +1,36 @@
+"""trades default partition
+
+Revision ID: 4c8a2e9f7b13
+Revises: 9b4e6c1d2f38
+Create Date: 2026-10-18 19:12:40.281937
+
+"""
+import datetime
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8a2e9f7b13'
+down_revision = '9b4e6c1d2f38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # rows without a daily partition go to trades_default instead of failing the whole INSERT
+    op.execute('CREATE TABLE IF NOT EXISTS trades_default PARTITION OF trades DEFAULT')
+    yesterday = datetime.datetime.utcnow().date() - datetime.timedelta(days=1)
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS trades_{name} PARTITION OF trades "
+        "FOR VALUES FROM ('{start}') TO ('{stop}')".format(
+            name=yesterday.strftime('%Y%m%d'),
+            start=yesterday.isoformat(),
+            stop=(yesterday + datetime.timedelta(days=1)).isoformat()
+        )
+    )
+
+
+def downgrade():
+    # rows of the default partition are lost
+    op.execute('DROP TABLE trades_default')
@@ -0,0 +1,47 @@
+"""volume profile
+
+Revision ID: 5d2f7b8e4a61
+Revises: e8b3a1f56c90
+Create Date: 2026-10-18 16:02:37.118409
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2f7b8e4a61'
+down_revision = 'e8b3a1f56c90'
+branch_labels = None
+depends_on = None
+
+
+# vpa.db.profile.BIN_STEP and RESOLUTION
+BIN_STEP = 0.001
+
+
+def upgrade():
+    op.create_table('volume_profile',
+    sa.Column('market', sa.String(length=10), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('order_type', sa.String(length=4), nullable=False),
+    sa.Column('bin', sa.Integer(), nullable=False),
+    sa.Column('volume', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('market', 'timestamp', 'order_type', 'bin')
+    )
+    op.execute("""
+        INSERT INTO volume_profile (market, timestamp, order_type, bin, volume)
+        SELECT
+            market,
+            date_trunc('hour', timestamp),
+            order_type,
+            floor(ln(rate) / ln(1 + {step})),
+            sum(quantity)
+        FROM trades
+        WHERE rate > 0
+        GROUP BY 1, 2, 3, 4
+    """.format(step=BIN_STEP))
+
+
+def downgrade():
+    op.drop_table('volume_profile')
@@ -0,0 +1,111 @@
+"""trades partitions
+
+Revision ID: 7a5e0c3b91d2
+Revises: 3f1c9d27a4e0
+Create Date: 2026-10-18 11:40:02.913574
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a5e0c3b91d2'
+down_revision = '3f1c9d27a4e0'
+branch_labels = None
+depends_on = None
+
+
+PARTITIONS_AHEAD = 3  # days
+
+
+def create_partition(day):
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS trades_{name} PARTITION OF trades "
+        "FOR VALUES FROM ('{start}') TO ('{stop}')".format(
+            name=day.strftime('%Y%m%d'),
+            start=day.isoformat(),
+            stop=(day + datetime.timedelta(days=1)).isoformat()
+        )
+    )
+
+
+def upgrade():
+    # requires PostgreSQL 11+ (primary key and indexes on a partitioned table)
+    op.drop_index('idx_timestamp', table_name='trades')
+    op.drop_index('idx_trades_market_timestamp', table_name='trades')
+    op.execute('ALTER TABLE trades DROP CONSTRAINT trades_pkey')
+    op.execute('ALTER TABLE trades RENAME TO trades_unpartitioned')
+    op.execute('ALTER SEQUENCE trades_trade_id_seq OWNED BY NONE')
+    op.execute('ALTER SEQUENCE trades_trade_id_seq AS bigint')
+
+    op.execute("""
+        CREATE TABLE trades (
+            trade_id BIGINT NOT NULL DEFAULT nextval('trades_trade_id_seq'),
+            market VARCHAR(10),
+            order_type VARCHAR(4),
+            rate FLOAT,
+            quantity FLOAT,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (trade_id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute('ALTER SEQUENCE trades_trade_id_seq OWNED BY trades.trade_id')
+    op.create_index('idx_timestamp', 'trades', ['timestamp'], unique=False)
+    op.create_index(
+        'idx_trades_market_timestamp',
+        'trades',
+        ['market', 'timestamp', 'order_type', 'rate', 'quantity'],
+        unique=False
+    )
+
+    first = op.get_bind().execute(sa.text('SELECT min(timestamp) FROM trades_unpartitioned')).scalar()
+    today = datetime.datetime.utcnow().date()
+    day = first.date() if first else today
+    while day <= today + datetime.timedelta(days=PARTITIONS_AHEAD):
+        create_partition(day)
+        day += datetime.timedelta(days=1)
+
+    op.execute("""
+        INSERT INTO trades (trade_id, market, order_type, rate, quantity, timestamp)
+        SELECT trade_id, market, order_type, rate, quantity, timestamp
+        FROM trades_unpartitioned
+        WHERE timestamp IS NOT NULL
+    """)
+    op.execute('DROP TABLE trades_unpartitioned')
+
+
+def downgrade():
+    op.drop_index('idx_timestamp', table_name='trades')
+    op.drop_index('idx_trades_market_timestamp', table_name='trades')
+    op.execute('ALTER TABLE trades DROP CONSTRAINT trades_pkey')
+    op.execute('ALTER TABLE trades RENAME TO trades_partitioned')
+    op.execute('ALTER SEQUENCE trades_trade_id_seq OWNED BY NONE')
+    op.execute("""
+        CREATE TABLE trades (
+            trade_id INTEGER NOT NULL DEFAULT nextval('trades_trade_id_seq'),
+            market VARCHAR(10),
+            order_type VARCHAR(4),
+            rate FLOAT,
+            quantity FLOAT,
+            timestamp TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (trade_id)
+        )
+    """)
+    op.execute("""
+        INSERT INTO trades (trade_id, market, order_type, rate, quantity, timestamp)
+        SELECT trade_id, market, order_type, rate, quantity, timestamp
+        FROM trades_partitioned
+    """)
+    op.execute('DROP TABLE trades_partitioned')
+    op.execute('ALTER SEQUENCE trades_trade_id_seq AS integer')
+    op.execute('ALTER SEQUENCE trades_trade_id_seq OWNED BY trades.trade_id')
+    op.create_index('idx_timestamp', 'trades', ['timestamp'], unique=False)
+    op.create_index(
+        'idx_trades_market_timestamp',
+        'trades',
+        ['market', 'timestamp', 'order_type', 'rate', 'quantity'],
+        unique=False
+    )
@@ -0,0 +1,35 @@
+"""levels
+
+Revision ID: 9b4e6c1d2f38
+Revises: 5d2f7b8e4a61
+Create Date: 2026-10-18 16:48:12.530274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4e6c1d2f38'
+down_revision = '5d2f7b8e4a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('levels',
+    sa.Column('level_id', sa.BigInteger(), nullable=False),
+    sa.Column('market', sa.String(length=10), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('kind', sa.String(length=10), nullable=True),
+    sa.Column('rate', sa.Float(), nullable=True),
+    sa.Column('volume', sa.Float(), nullable=True),
+    sa.Column('share', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('level_id')
+    )
+    op.create_index('idx_levels_market', 'levels', ['market'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_levels_market', table_name='levels')
+    op.drop_table('levels')
@@ -0,0 +1,57 @@
+"""minutes rollups
+
+Revision ID: c42d8e6f0b17
+Revises: 7a5e0c3b91d2
+Create Date: 2026-10-18 13:05:48.220931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c42d8e6f0b17'
+down_revision = '7a5e0c3b91d2'
+branch_labels = None
+depends_on = None
+
+
+ROLLUPS = (
+    ('minutes_5m', 300),
+    ('minutes_1h', 3600),
+    ('minutes_1d', 86400)
+)
+
+
+def upgrade():
+    for name, resolution in ROLLUPS:
+        op.create_table(name,
+        sa.Column('market', sa.String(length=10), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('vsell', sa.Float(), nullable=True),
+        sa.Column('vbuy', sa.Float(), nullable=True),
+        sa.Column('nsell', sa.Integer(), nullable=True),
+        sa.Column('nbuy', sa.Integer(), nullable=True),
+        sa.Column('ratesell', sa.Float(), nullable=True),
+        sa.Column('ratebuy', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('market', 'timestamp')
+        )
+        op.execute("""
+            INSERT INTO {name} (market, timestamp, vsell, vbuy, nsell, nbuy, ratesell, ratebuy)
+            SELECT
+                market,
+                to_timestamp(floor(extract(epoch FROM timestamp) / {resolution}) * {resolution}) AT TIME ZONE 'UTC',
+                sum(vsell),
+                sum(vbuy),
+                sum(nsell),
+                sum(nbuy),
+                (array_agg(ratesell ORDER BY timestamp DESC) FILTER (WHERE ratesell IS NOT NULL))[1],
+                (array_agg(ratebuy ORDER BY timestamp DESC) FILTER (WHERE ratebuy IS NOT NULL))[1]
+            FROM minutes
+            GROUP BY 1, 2
+        """.format(name=name, resolution=resolution))
+
+
+def downgrade():
+    for name, _ in reversed(ROLLUPS):
+        op.drop_table(name)
@@ -0,0 +1,35 @@
+"""decisions
+
+Revision ID: e8b3a1f56c90
+Revises: c42d8e6f0b17
+Create Date: 2026-10-18 15:21:09.604317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b3a1f56c90'
+down_revision = 'c42d8e6f0b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('decisions',
+    sa.Column('decision_id', sa.BigInteger(), nullable=False),
+    sa.Column('market', sa.String(length=10), nullable=True),
+    sa.Column('strategy', sa.String(length=32), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('rate', sa.Float(), nullable=True),
+    sa.Column('do', sa.SmallInteger(), nullable=True),
+    sa.Column('indicators', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('decision_id')
+    )
+    op.create_index('idx_decisions_market_timestamp', 'decisions', ['market', 'timestamp'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_decisions_market_timestamp', table_name='decisions')
+    op.drop_table('decisions')
@@ -8,12 +8,46 @@ if __name__ == '__main__':
     ioloop = asyncio.get_event_loop()
 
     if command == 'watch':
-        from vpa.watcher import main
-        ioloop.run_until_complete(main(markets=arguments[0].split(',')))
+        from vpa.watcher import main, parse_args
+        args = parse_args(arguments)
+        ioloop.run_until_complete(main(
+            markets=args.markets.split(','),
+            strategies=[s for s in args.strategies.split(',') if s],
+            shards=args.shards
+        ))
 
     elif command == 'server':
         from vpa.server import main
-        main()
+        main(arguments)
+
+    elif command == 'backtest':
+        from vpa.backtest import main
+        main(arguments)
+
+    elif command == 'bench_decode':
+        from vpa.benchmarks.decode import main
+        main(path=arguments[0] if arguments else None)
+
+    elif command == 'bench_ingest':
+        from vpa.benchmarks.ingest import main
+        main(arguments)
+
+    elif command == 'seed':
+        from vpa.benchmarks.seed import main
+        main(arguments)
+
+    elif command == 'bench_load':
+        from vpa.benchmarks.load import main
+        main(arguments)
+
+    elif command == 'retention':
+        from vpa.retention import main
+        ioloop.run_until_complete(main(days=int(arguments[0])))
+
+    elif command == 'explain':
+        from vpa.explain import main
+        if not ioloop.run_until_complete(main(market=arguments[0] if arguments else 'BTC-ETH')):
+            sys.exit(1)
 
     else:
         raise ValueError("Unknown command.")
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+
+def run_coroutine(coroutine):
+    # a fresh loop per call, asyncio.run is not available on python 3.6
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class SlowEngine:
+
+    class Connection:
+
+        def begin(self):
+            return self
+
+        async def execute(self, query):
+            await asyncio.sleep(1)
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+    def acquire(self):
+        return self.Connection()
+
+
+@pytest.fixture
+def run():
+    return run_coroutine
+
+
+@pytest.fixture
+def slow_engine():
+    return SlowEngine()
+
+
+@pytest.fixture
+def cancel_flush():
+    def cancel(aggregator):
+        async def main():
+            flush = asyncio.ensure_future(aggregator.flush())
+            await asyncio.sleep(0.01)
+            flush.cancel()
+            await asyncio.gather(flush, return_exceptions=True)
+        run_coroutine(main())
+    return cancel
@@ -0,0 +1,83 @@
+import datetime
+
+import pytest
+
+from vpa.aggregator import MinutesAggregator, empty_bucket, merge_bucket, rollup
+from vpa.db.minutes import truncate
+
+
+START = datetime.datetime(2018, 1, 1, 10, 0)
+
+
+class FailingEngine:
+
+    def acquire(self):
+        raise RuntimeError('database is down')
+
+
+def test_add():
+    aggregator = MinutesAggregator(db_engine=None, flush_interval=10)
+    aggregator.add('BTC-ETH', 'BUY', 10, 1, START + datetime.timedelta(seconds=5))
+    aggregator.add('BTC-ETH', 'BUY', 11, 2, START + datetime.timedelta(seconds=50))
+    aggregator.add('BTC-ETH', 'SELL', 9, 4, START + datetime.timedelta(seconds=59))
+    aggregator.add('BTC-ETH', 'SELL', 8, 8, START + datetime.timedelta(seconds=60))
+    assert aggregator._buckets == {
+        ('BTC-ETH', START): {'vsell': 4, 'vbuy': 3, 'nsell': 1, 'nbuy': 2, 'ratesell': 9, 'ratebuy': 11},
+        ('BTC-ETH', START + datetime.timedelta(minutes=1)): {
+            'vsell': 8, 'vbuy': 0, 'nsell': 1, 'nbuy': 0, 'ratesell': 8, 'ratebuy': None
+        }
+    }
+
+
+def test_merge_bucket_keeps_last_rates():
+    bucket = dict(empty_bucket(), vbuy=1, nbuy=1, ratebuy=10, ratesell=5)
+    merge_bucket(bucket, dict(empty_bucket(), vbuy=2, nbuy=1, ratebuy=12))
+    assert bucket == {'vsell': 0, 'vbuy': 3, 'nsell': 0, 'nbuy': 2, 'ratesell': 5, 'ratebuy': 12}
+
+
+def test_failed_flush_keeps_buckets(run):
+    aggregator = MinutesAggregator(db_engine=FailingEngine(), flush_interval=10)
+    aggregator.add('BTC-ETH', 'BUY', 10, 1, START)
+    with pytest.raises(RuntimeError):
+        run(aggregator.flush())
+    aggregator.add('BTC-ETH', 'BUY', 11, 2, START)
+    assert aggregator._buckets == {
+        ('BTC-ETH', START): {'vsell': 0, 'vbuy': 3, 'nsell': 0, 'nbuy': 2, 'ratesell': None, 'ratebuy': 11}
+    }
+
+
+def test_truncate():
+    timestamp = datetime.datetime(2018, 1, 1, 10, 17, 42, 500)
+    assert truncate(timestamp, 60) == datetime.datetime(2018, 1, 1, 10, 17)
+    assert truncate(timestamp, 300) == datetime.datetime(2018, 1, 1, 10, 15)
+    assert truncate(timestamp, 3600) == datetime.datetime(2018, 1, 1, 10)
+    assert truncate(timestamp, 86400) == datetime.datetime(2018, 1, 1)
+
+
+def test_rollup():
+    buckets = {
+        ('BTC-ETH', START + datetime.timedelta(minutes=4)): dict(empty_bucket(), vbuy=2, nbuy=1, ratebuy=12),
+        ('BTC-ETH', START): dict(empty_bucket(), vbuy=1, nbuy=1, ratebuy=10, vsell=1, nsell=1, ratesell=9),
+        ('BTC-ETH', START + datetime.timedelta(minutes=5)): dict(empty_bucket(), vsell=3, nsell=1, ratesell=8),
+        ('BTC-LTC', START): dict(empty_bucket(), vsell=5, nsell=2, ratesell=1)
+    }
+    assert rollup(buckets, 300) == {
+        # rates are from the latest minute that has them
+        ('BTC-ETH', START): {'vsell': 1, 'vbuy': 3, 'nsell': 1, 'nbuy': 2, 'ratesell': 9, 'ratebuy': 12},
+        ('BTC-ETH', START + datetime.timedelta(minutes=5)): {
+            'vsell': 3, 'vbuy': 0, 'nsell': 1, 'nbuy': 0, 'ratesell': 8, 'ratebuy': None
+        },
+        ('BTC-LTC', START): {'vsell': 5, 'vbuy': 0, 'nsell': 2, 'nbuy': 0, 'ratesell': 1, 'ratebuy': None}
+    }
+    assert rollup(buckets, 3600)[('BTC-ETH', START)]['vsell'] == 4
+    # source buckets are not changed
+    assert buckets[('BTC-ETH', START)]['vbuy'] == 1
+
+
+def test_cancelled_flush_keeps_buckets(slow_engine, cancel_flush):
+    aggregator = MinutesAggregator(db_engine=slow_engine, flush_interval=10)
+    aggregator.add('BTC-ETH', 'BUY', 10, 1, START)
+    cancel_flush(aggregator)
+    assert aggregator._buckets == {
+        ('BTC-ETH', START): {'vsell': 0, 'vbuy': 1, 'nsell': 0, 'nbuy': 1, 'ratesell': None, 'ratebuy': 10}
+    }
@@ -0,0 +1,53 @@
+import datetime
+
+import numpy
+import pytest
+
+from vpa.backtest import TradesArrays, replay, simulate
+from vpa.bl import StrategyRegistry
+from vpa.bl.base import Decision
+
+
+BUY = Decision.BUY
+SELL = Decision.SELL
+
+
+def trades(n):
+    start = datetime.datetime(2018, 1, 1)
+    return TradesArrays.from_rows([
+        (start + datetime.timedelta(seconds=i), 'BUY' if i % 2 else 'SELL', 1.0 + i, 10.0 + i)
+        for i in range(n)
+    ])
+
+
+def test_from_rows():
+    timestamp = datetime.datetime(2018, 1, 1)
+    arrays = TradesArrays.from_rows([(timestamp, 'SELL', 2.0, 3.0), (timestamp, 'X', 0, 0)])
+    assert len(arrays) == 2
+    assert list(arrays.order_types) == [1, 255]
+
+
+def test_simulate():
+    rates = numpy.array([10, 11, 12, 9, 10, 20], dtype=numpy.float64)
+    decisions = numpy.array([BUY, BUY, SELL, SELL, BUY, 0], dtype=numpy.int8)
+    closed, profit = simulate(decisions=decisions, rates=rates)
+    assert closed == 1
+    # +20% closed, +100% open position valued at the last rate
+    assert profit == pytest.approx(120)
+
+
+def test_simulate_nothing():
+    assert simulate(decisions=numpy.zeros(0, dtype=numpy.int8), rates=numpy.zeros(0)) == (0, 0)
+
+
+@pytest.mark.parametrize('name', ['pump'])
+def test_vectorized_matches_replay(name):
+    data = trades(50)
+    strategy = StrategyRegistry.get(name)
+    vectorized = strategy().decide_vectorized(
+        timestamps=data.timestamps,
+        order_types=data.order_types,
+        quantities=data.quantities,
+        rates=data.rates
+    )
+    assert list(vectorized) == list(replay(strategy=strategy(), trades=data))
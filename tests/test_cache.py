@@ -0,0 +1,45 @@
+import time
+
+from vpa.cache import ResponseCache
+
+
+def test_hit_and_stale_version():
+    cache = ResponseCache(maxsize=10, ttl=60)
+    assert cache.get('a', version=1) is None
+    cache.set('a', version=1, value='page')
+    assert cache.get('a', version=1) == 'page'
+    # a new trade (or aggregates flush) changes the version
+    assert cache.get('a', version=2) is None
+    assert cache.get('a', version=1) is None
+    assert cache.stats['hits'] == 1
+    assert cache.stats['stale'] == 1
+    assert cache.stats['misses'] == 3
+
+
+def test_ttl():
+    cache = ResponseCache(maxsize=10, ttl=0.01)
+    cache.set('a', version=1, value='page')
+    time.sleep(0.02)
+    assert cache.get('a', version=1) is None
+    assert cache.stats['expired'] == 1
+    assert len(cache) == 0
+
+
+def test_lru_eviction():
+    cache = ResponseCache(maxsize=2, ttl=60)
+    cache.set('a', version=1, value='a')
+    cache.set('b', version=1, value='b')
+    cache.get('a', version=1)
+    cache.set('c', version=1, value='c')
+    assert len(cache) == 2
+    assert cache.get('b', version=1) is None
+    assert cache.get('a', version=1) == 'a'
+    assert cache.stats['evictions'] == 1
+
+
+def test_row_versions():
+    # versions are rows of version queries
+    cache = ResponseCache(maxsize=10, ttl=60)
+    cache.set('a', version=('2018-01-01 10:00', 3, 4), value='page')
+    assert cache.get('a', version=('2018-01-01 10:00', 3, 4)) == 'page'
+    assert cache.get('a', version=('2018-01-01 10:00', 3, 5)) is None
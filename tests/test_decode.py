@@ -0,0 +1,40 @@
+import datetime
+import json
+
+from vpa.decode import Fill, decode_frame, parse_timestamp
+
+
+def test_parse_timestamp():
+    assert parse_timestamp('2018-03-17T14:43:04') == datetime.datetime(2018, 3, 17, 14, 43, 4)
+    assert parse_timestamp('2018-03-17T14:43:04.257') == datetime.datetime(2018, 3, 17, 14, 43, 4, 257000)
+    assert parse_timestamp('2018-03-17T14:43:04.1234567') == datetime.datetime(2018, 3, 17, 14, 43, 4, 123456)
+
+
+def test_parse_timestamp_fallback():
+    # shorter than the fast path expects
+    assert parse_timestamp('2018-01-01') == datetime.datetime(2018, 1, 1)
+    assert parse_timestamp('2018-03-17T14:43') == datetime.datetime(2018, 3, 17, 14, 43)
+    assert parse_timestamp('2018-03-17T14:43:04Z') == datetime.datetime(
+        2018, 3, 17, 14, 43, 4, tzinfo=datetime.timezone.utc
+    )
+
+
+def test_decode_frame():
+    frame = json.dumps({'M': [
+        {'M': 'updateSummaryState', 'A': [{}]},
+        {'M': 'updateExchangeState', 'A': [
+            {'MarketName': 'BTC-ETH', 'Fills': [
+                {'OrderType': 'BUY', 'Rate': 0.05, 'Quantity': 1.5, 'TimeStamp': '2018-03-17T14:43:04.257'},
+                {'OrderType': 'SELL', 'Rate': 0.04, 'Quantity': 2, 'TimeStamp': '2018-03-17T14:43:05'}
+            ]},
+            {'MarketName': 'BTC-LTC', 'Fills': []}
+        ]}
+    ]})
+    assert decode_frame(frame) == [('BTC-ETH', [
+        Fill('BTC-ETH', 'BUY', 0.05, 1.5, datetime.datetime(2018, 3, 17, 14, 43, 4, 257000)),
+        Fill('BTC-ETH', 'SELL', 0.04, 2, datetime.datetime(2018, 3, 17, 14, 43, 5))
+    ])]
+
+
+def test_decode_frame_without_messages():
+    assert decode_frame('{"C": "d-1,0|"}') == []
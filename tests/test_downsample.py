@@ -0,0 +1,56 @@
+import datetime
+
+import numpy
+import pytest
+
+from vpa.downsample import downsample, lttb
+
+
+def test_lttb_keeps_edges_and_length():
+    x = numpy.arange(1000, dtype=numpy.float64)
+    y = numpy.sin(x / 50)
+    for threshold in (3, 10, 100, 999):
+        indices = lttb(x, y, threshold)
+        assert len(indices) == threshold
+        assert indices[0] == 0
+        assert indices[-1] == len(x) - 1
+        assert (numpy.diff(indices) > 0).all()
+
+
+@pytest.mark.parametrize('threshold', [2, 5, 6, 10])
+def test_lttb_passthrough(threshold):
+    # threshold >= len or too small to pick a point per bucket
+    x = numpy.arange(5, dtype=numpy.float64)
+    assert list(lttb(x, x, threshold)) == [0, 1, 2, 3, 4]
+
+
+def test_lttb_keeps_spike():
+    x = numpy.arange(100, dtype=numpy.float64)
+    y = numpy.zeros(100)
+    y[37] = 10
+    assert 37 in lttb(x, y, 10)
+
+
+def points(n):
+    start = datetime.datetime(2018, 1, 1)
+    return [{'x': (start + datetime.timedelta(minutes=i)).isoformat(), 'y': float(i % 7)} for i in range(n)]
+
+
+def test_downsample():
+    data = points(500)
+    result = downsample(data, 50)
+    assert len(result) == 50
+    assert result[0] is data[0]
+    assert result[-1] is data[-1]
+
+
+def test_downsample_passthrough():
+    data = points(50)
+    assert downsample(data, 50) == data
+    assert downsample(data, 0) == data
+
+
+def test_downsample_drops_empty_values():
+    data = points(10)
+    data[3]['y'] = None
+    assert len(downsample(data, 100)) == 9
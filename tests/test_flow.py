@@ -0,0 +1,70 @@
+import warnings
+
+import numpy
+from numpy.testing import assert_allclose, assert_array_equal
+
+from vpa.flow import close_rates, forward_fill, money_flow, rolling_sum
+
+
+NAN = numpy.nan
+
+
+def test_rolling_sum():
+    values = numpy.array([1, 2, 3, 4, 5], dtype=numpy.float64)
+    assert_array_equal(rolling_sum(values, 2), [1, 3, 5, 7, 9])
+    assert_array_equal(rolling_sum(values, 1), values)
+
+
+def test_rolling_sum_window_longer_than_series():
+    values = numpy.array([1, 2, 3], dtype=numpy.float64)
+    assert_array_equal(rolling_sum(values, 10), [1, 3, 6])
+    assert len(rolling_sum(numpy.array([]), 5)) == 0
+
+
+def test_forward_fill():
+    assert_array_equal(forward_fill(numpy.array([1, NAN, NAN, 4, NAN])), [1, 1, 1, 4, 4])
+
+
+def test_forward_fill_leading_nan():
+    assert_array_equal(forward_fill(numpy.array([NAN, NAN, 3, NAN])), [NAN, NAN, 3, 3])
+    assert_array_equal(forward_fill(numpy.array([NAN, NAN])), [NAN, NAN])
+
+
+def test_close_rates():
+    close = close_rates(numpy.array([NAN, 2, NAN, NAN]), numpy.array([NAN, 4, 5, NAN]))
+    assert_array_equal(close, [NAN, 3, 5, 5])
+
+
+def test_money_flow():
+    result = money_flow(
+        vsell=numpy.array([1, 2, 0, 1], dtype=numpy.float64),
+        vbuy=numpy.array([3, 0, 2, 1], dtype=numpy.float64),
+        ratesell=numpy.array([10, 9, NAN, 11]),
+        ratebuy=numpy.array([10, NAN, 12, 11]),
+        window=2
+    )
+    assert_array_equal(result['cvd'], [2, 0, 2, 2])
+    # close: 10, 9, 12, 11
+    assert_array_equal(result['obv'], [0, -2, 0, -2])
+    assert_allclose(result['vwap'], [10, (40 + 18) / 6, (18 + 24) / 4, (24 + 22) / 4])
+    assert_allclose(result['cmf'], [0.5, 0, 0, 0.5])
+
+
+def test_money_flow_without_volume():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')  # no division by zero warnings
+        result = money_flow(
+            vsell=numpy.zeros(4),
+            vbuy=numpy.array([0, 0, 1, 0], dtype=numpy.float64),
+            ratesell=numpy.full(4, NAN),
+            ratebuy=numpy.array([NAN, NAN, 5, NAN]),
+            window=1
+        )
+    assert_array_equal(result['vwap'], [NAN, NAN, 5, NAN])
+    assert_array_equal(result['cmf'], [0, 0, 1, 0])
+    assert_array_equal(result['obv'], [0, 0, 0, 0])
+
+
+def test_money_flow_empty():
+    result = money_flow(*[numpy.array([], dtype=numpy.float64)] * 4, window=20)
+    assert all(len(values) == 0 for values in result.values())
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from vpa.ingest import IngestQueue
+
+
+class Handler:
+
+    def __init__(self):
+        self.items = []
+
+    async def __call__(self, n):
+        self.items.append(n)
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        IngestQueue(handler=Handler(), maxsize=2, policy='wait')
+
+
+def test_spill(run):
+    async def main():
+        handler = Handler()
+        queue = IngestQueue(handler=handler, maxsize=2, policy='spill')
+        for n in range(5):
+            await queue.put(n=n)
+        assert queue.depth == 5
+        assert queue.stats['spilled'] == 3
+        assert queue.stats['max_depth'] == 5
+
+        queue.start()
+        await asyncio.sleep(0.01)
+        await queue.stop()
+        assert handler.items == [0, 1, 2, 3, 4]
+        assert queue.depth == 0
+        assert queue.stats['handled'] == 5
+    run(main())
+
+
+def test_drop_oldest(run):
+    async def main():
+        handler = Handler()
+        queue = IngestQueue(handler=handler, maxsize=2, policy='drop_oldest')
+        for n in range(5):
+            await queue.put(n=n)
+        assert queue.depth == 2
+        assert queue.stats['dropped'] == 3
+        assert queue.stats['max_depth'] == 2
+
+        await queue.stop()
+        assert handler.items == [3, 4]
+    run(main())
+
+
+def test_block(run):
+    async def main():
+        handler = Handler()
+        queue = IngestQueue(handler=handler, maxsize=2, policy='block')
+        await queue.put(n=0)
+        await queue.put(n=1)
+        blocked = asyncio.ensure_future(queue.put(n=2))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        assert queue.depth == 2
+
+        queue.start()
+        await asyncio.wait_for(blocked, 1)
+        await asyncio.sleep(0.01)
+        await queue.stop()
+        assert handler.items == [0, 1, 2]
+        assert queue.stats['spilled'] == queue.stats['dropped'] == 0
+    run(main())
+
+
+def test_wait_time_and_errors(run):
+    async def failing(n):
+        if n == 1:
+            raise RuntimeError(n)
+
+    async def main():
+        queue = IngestQueue(handler=failing, maxsize=10)
+        for n in range(3):
+            await queue.put(n=n)
+        await asyncio.sleep(0.05)
+        await queue.stop()
+        stats = queue.stats
+        assert stats['handled'] == 3
+        assert stats['errors'] == 1
+        assert stats['max_wait_time'] >= 0.05
+        assert stats['wait_time'] >= 0.15
+    run(main())
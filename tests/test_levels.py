@@ -0,0 +1,79 @@
+import numpy
+import pytest
+
+from vpa.db.profile import bin_rate
+from vpa.levels import RESISTANCE, SUPPORT, find_levels, find_peaks
+
+
+def profile(size, peaks):
+    """
+    Flat volume with gaussian clusters, peaks are {position: height}.
+    """
+    x = numpy.arange(size)
+    volume = numpy.ones(size)
+    for position, height in peaks.items():
+        volume += height * numpy.exp(-((x - position) / 2.0) ** 2)
+    return volume
+
+
+def test_find_peaks_strongest_first():
+    volume = profile(200, {30: 20, 100: 50, 160: 10})
+    assert list(find_peaks(volume, max_levels=10)) == [100, 30, 160]
+    assert list(find_peaks(volume, max_levels=2)) == [100, 30]
+
+
+def test_find_peaks_min_distance():
+    volume = profile(200, {100: 50, 108: 40, 150: 30})
+    assert list(find_peaks(volume, max_levels=10, min_distance=5)) == [100, 108, 150]
+    # the weaker one is too close to a stronger level
+    assert list(find_peaks(volume, max_levels=10, min_distance=10)) == [100, 150]
+
+
+@pytest.mark.parametrize('volume', [
+    numpy.array([]),
+    numpy.array([1.0, 2.0]),
+    numpy.zeros(100),
+    numpy.ones(100)
+])
+def test_find_peaks_nothing(volume):
+    assert len(find_peaks(volume, max_levels=10)) == 0
+
+
+def test_find_levels():
+    volume = profile(200, {30: 20, 100: 50})
+    bins = numpy.arange(200) - 1000
+    last_rate = bin_rate(-1000 + 60)
+    # rows come in any order
+    order = numpy.random.RandomState(0).permutation(200)
+    levels = find_levels(bins=bins[order], volumes=volume[order], last_rate=last_rate, max_levels=10)
+    assert [level['kind'] for level in levels] == [SUPPORT, RESISTANCE]
+    assert levels[0]['rate'] == pytest.approx(bin_rate(-1000 + 30))
+    assert levels[1]['rate'] == pytest.approx(bin_rate(-1000 + 100))
+    assert levels[1]['volume'] > levels[0]['volume']
+    assert 0 < sum(level['share'] for level in levels) < 1
+
+
+def test_find_levels_empty():
+    empty = numpy.array([], dtype=numpy.int64)
+    assert find_levels(bins=empty, volumes=empty.astype(numpy.float64), last_rate=1, max_levels=10) == []
+
+
+@pytest.mark.parametrize('volume', [
+    numpy.array([0, 10, 0], dtype=numpy.float64),
+    numpy.array([0, 0, 10, 0], dtype=numpy.float64),
+    numpy.array([1, 10, 1, 1], dtype=numpy.float64)
+])
+def test_find_peaks_shorter_than_smooth(volume):
+    peaks = find_peaks(volume, max_levels=10, threshold=1)
+    assert list(peaks) == [int(volume.argmax())]
+
+
+def test_find_levels_shorter_than_smooth():
+    levels = find_levels(
+        bins=numpy.array([100, 103]),
+        volumes=numpy.array([0, 10], dtype=numpy.float64),
+        last_rate=bin_rate(90),
+        max_levels=10
+    )
+    # the only volume is at the profile edge, no bin without volume is reported
+    assert all(level['rate'] == pytest.approx(bin_rate(103)) for level in levels)
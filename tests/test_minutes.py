@@ -0,0 +1,18 @@
+import datetime
+
+from vpa.db.minutes import DaysTable, HoursTable, Minutes5Table, MinutesTable
+from vpa.handlers.minutes import pick_resolution
+
+
+START = datetime.datetime(2018, 1, 1)
+
+
+def test_pick_resolution():
+    def table(hours):
+        _, result = pick_resolution(start=START, stop=START + datetime.timedelta(hours=hours), min_points=200)
+        return result
+    assert table(1) is MinutesTable
+    assert table(3) is MinutesTable
+    assert table(17) is Minutes5Table
+    assert table(24 * 10) is HoursTable
+    assert table(24 * 365) is DaysTable
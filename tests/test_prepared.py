@@ -0,0 +1,37 @@
+import sqlalchemy as sa
+
+from vpa.db.prepared import STATEMENTS, PreparedStatement, statements_stats
+from vpa.handlers.analysis import profile_query
+
+
+def test_positional_parameters():
+    statement = PreparedStatement('test_profile', profile_query(
+        market=sa.bindparam('market'),
+        since=sa.bindparam('since'),
+        from_bin=sa.bindparam('from_bin'),
+        to_bin=sa.bindparam('to_bin')
+    ))
+    # a parameter used twice gets one position
+    assert statement.params == ['from_bin', 'to_bin', 'market', 'since']
+    assert statement.sql.count('$1') == 2
+    assert '%(' not in statement.sql
+    assert statement._execute_sql == 'EXECUTE test_profile (%s, %s, %s, %s)'
+    assert STATEMENTS['test_profile'] is statement
+
+
+def test_text_statement():
+    statement = PreparedStatement(
+        'test_insert',
+        'INSERT INTO t (a, b) SELECT * FROM unnest(%(a)s::int[], %(b)s::int[])'
+    )
+    assert statement.sql == 'INSERT INTO t (a, b) SELECT * FROM unnest($1::int[], $2::int[])'
+    assert statement.params == ['a', 'b']
+
+
+def test_without_parameters():
+    statement = PreparedStatement('test_count', 'SELECT count(*) FROM trades')
+    assert statement._execute_sql == 'EXECUTE test_count'
+    stats = statements_stats()['test_count']
+    assert stats['executions'] == 0
+    assert stats['avg_execute_time'] == 0
+    assert stats['compile_time'] >= 0
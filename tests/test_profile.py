@@ -0,0 +1,50 @@
+import datetime
+
+import pytest
+
+from vpa.aggregator import ProfileAggregator
+from vpa.db.profile import BIN_STEP, bin_rate, rate_bin
+from vpa.handlers.analysis import max_levels
+
+
+@pytest.mark.parametrize('rate', [0.00000123, 0.0534, 1, 1.0005, 7123.4])
+def test_rate_in_its_bin(rate):
+    n = rate_bin(rate)
+    assert (1 + BIN_STEP) ** n <= rate * (1 + 1e-12)
+    assert rate < (1 + BIN_STEP) ** (n + 1)
+    assert rate_bin(bin_rate(n)) == n
+
+
+def test_bins_are_bin_step_wide():
+    assert bin_rate(1) / bin_rate(0) == pytest.approx(1 + BIN_STEP)
+    assert rate_bin(1.0) == 0
+    assert rate_bin(0.9999) == -1
+
+
+def test_profile_aggregator_add():
+    hour = datetime.datetime(2018, 1, 1, 10)
+    aggregator = ProfileAggregator(db_engine=None, flush_interval=10)
+    aggregator.add('BTC-ETH', 'BUY', 1.0, 2, hour + datetime.timedelta(minutes=5))
+    aggregator.add('BTC-ETH', 'BUY', 1.0002, 3, hour + datetime.timedelta(minutes=50))
+    aggregator.add('BTC-ETH', 'SELL', 1.0, 1, hour)
+    aggregator.add('BTC-ETH', 'SELL', 0, 1, hour)  # no bin for zero rates
+    assert aggregator._cells == {
+        ('BTC-ETH', hour, 'BUY', 0): 5,
+        ('BTC-ETH', hour, 'SELL', 0): 1
+    }
+
+
+def test_max_levels():
+    # buckets are at least a bin (0.1%) wide
+    assert max_levels(5) == 100
+    assert max_levels(0.3) == 6
+    assert max_levels(0.01) == 0
+
+
+def test_cancelled_flush_keeps_cells(slow_engine, cancel_flush):
+    hour = datetime.datetime(2018, 1, 1, 10)
+    aggregator = ProfileAggregator(db_engine=slow_engine, flush_interval=10)
+    aggregator.add('BTC-ETH', 'BUY', 1.0, 2, hour)
+    cancel_flush(aggregator)
+    aggregator.add('BTC-ETH', 'BUY', 1.0, 3, hour)
+    assert aggregator._cells == {('BTC-ETH', hour, 'BUY', 0): 5}
@@ -0,0 +1,79 @@
+import datetime
+import random
+
+import pytest
+
+from vpa.bl.base import TradesBuffer
+
+
+START = datetime.datetime(2018, 1, 1)
+
+
+def at(seconds):
+    return START + datetime.timedelta(seconds=seconds)
+
+
+def contents(buffer):
+    return [(buffer.timestamp(i), buffer.quantity(i), buffer.rate(i)) for i in range(len(buffer))]
+
+
+def test_empty():
+    buffer = TradesBuffer(size=4)
+    assert len(buffer) == 0
+    assert buffer.bisect(at(0)) == 0
+    assert buffer.range(at(0), at(10)) == (0, 0)
+    assert buffer.volume(0, 0) == 0
+
+
+def test_wraparound_keeps_newest():
+    buffer = TradesBuffer(size=4)
+    for i in range(10):
+        buffer.append(timestamp=at(i), quantity=i, rate=i * 10)
+    assert len(buffer) == 4
+    assert contents(buffer) == [(at(i), i, i * 10) for i in range(6, 10)]
+
+
+def test_volume_across_wrap():
+    buffer = TradesBuffer(size=4)
+    for i in range(6):
+        buffer.append(timestamp=at(i), quantity=i + 1, rate=1)
+    # buffer holds quantities 3, 4, 5, 6, the physical start is in the middle of the lists
+    assert buffer.volume(0, 4) == 18
+    assert buffer.volume(1, 3) == 9
+    assert buffer.volume(3, 4) == 6
+    assert buffer.volume(2, 2) == 0
+    assert buffer.volume(*buffer.range(at(3), at(5))) == 9
+
+
+def test_late_trade_when_full():
+    buffer = TradesBuffer(size=3)
+    for i in (0, 2, 4):
+        buffer.append(timestamp=at(i), quantity=1, rate=i)
+    buffer.append(timestamp=at(3), quantity=2, rate=3)
+    assert [t for t, _, _ in contents(buffer)] == [at(2), at(3), at(4)]
+    assert buffer.volume(0, 3) == 4
+    # older than everything kept
+    buffer.append(timestamp=at(1), quantity=5, rate=1)
+    assert [t for t, _, _ in contents(buffer)] == [at(2), at(3), at(4)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_sorted_list(seed):
+    rnd = random.Random(seed)
+    size = 16
+    buffer = TradesBuffer(size=size)
+    trades = []
+    for i in range(200):
+        # mostly in order, some late
+        timestamp = at(i - rnd.choice([0, 0, 0, 0, 3]))
+        quantity = rnd.randint(1, 100)
+        buffer.append(timestamp=timestamp, quantity=quantity, rate=i)
+        if len(trades) < size or timestamp >= trades[0][0]:
+            trades.append((timestamp, quantity, i))
+            trades.sort(key=lambda trade: trade[0])
+            trades = trades[-size:]
+
+        assert [(t, q) for t, q, _ in contents(buffer)] == [(t, q) for t, q, _ in trades]
+        start, stop = sorted(at(rnd.randint(i - 20, i + 1)) for _ in range(2))
+        lo, hi = buffer.range(start, stop)
+        assert buffer.volume(lo, hi) == sum(q for t, q, _ in trades if start <= t < stop)
@@ -0,0 +1,131 @@
+import asyncio
+import datetime
+
+import pytest
+
+from vpa.db.trades import TradesTable
+from vpa.decode import Fill
+from vpa.writer import BatchWriter
+
+
+class Transaction:
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        self.conn.pending = []
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.engine.committed.extend(self.conn.pending)
+
+
+class Connection:
+    """
+    Keeps EXECUTE parameters in a transaction, fails on the `fail_on`-th insert.
+    """
+
+    class Raw:
+        pass
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.connection = self.Raw()
+        self.pending = []
+
+    def begin(self):
+        return Transaction(self)
+
+    async def execute(self, query, *params):
+        if str(query).startswith('EXECUTE'):
+            await asyncio.sleep(self.engine.delay)
+            self.engine.inserts += 1
+            if self.engine.inserts == self.engine.fail_on:
+                raise RuntimeError('insert failed')
+            self.pending.append(params[0][0])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class Engine:
+
+    def __init__(self, fail_on=None, delay=0):
+        self.fail_on = fail_on
+        self.delay = delay
+        self.inserts = 0
+        self.committed = []
+
+    def acquire(self):
+        return Connection(self)
+
+
+def fills(n, start=0):
+    timestamp = datetime.datetime(2018, 1, 1)
+    return [Fill('BTC-ETH', 'BUY', float(i), 1.0, timestamp) for i in range(start, start + n)]
+
+
+def written(engine):
+    return [rate for batch in engine.committed for rate in batch[2]]
+
+
+def test_flush_in_batches(run):
+    engine = Engine()
+    writer = BatchWriter(db_engine=engine, table=TradesTable, batch_size=2, flush_interval=1, columns=Fill._fields)
+    run(writer.add(fills(1)))
+    assert writer.pending == 1
+    assert written(engine) == []
+    # batch_size rows pending, all of them are written in chunks of batch_size
+    run(writer.add(fills(2, start=1)))
+    assert writer.pending == 0
+    assert engine.inserts == 2
+    assert written(engine) == [0, 1, 2]
+    assert writer.stats['rows'] == 3
+
+
+def test_failed_flush_is_not_written_twice(run):
+    engine = Engine(fail_on=2)
+    writer = BatchWriter(db_engine=engine, table=TradesTable, batch_size=2, flush_interval=1, columns=Fill._fields)
+    writer._rows = fills(4)
+    with pytest.raises(RuntimeError):
+        run(writer.flush())
+    # the first chunk was rolled back with the second one
+    assert written(engine) == []
+    assert writer.pending == 4
+    run(writer.flush())
+    assert written(engine) == [0, 1, 2, 3]
+
+
+def test_max_pending_drops_oldest(run):
+    engine = Engine(fail_on=1)
+    writer = BatchWriter(
+        db_engine=engine, table=TradesTable, batch_size=10, flush_interval=1, columns=Fill._fields, max_pending=3
+    )
+    run(writer.add(fills(5)))
+    assert writer.pending == 3
+    assert writer.stats['dropped'] == 2
+    with pytest.raises(RuntimeError):
+        run(writer.flush())
+    assert writer.pending == 3
+    run(writer.flush())
+    assert written(engine) == [2, 3, 4]
+
+
+def test_cancelled_flush_keeps_rows(run):
+    engine = Engine(delay=1)
+    writer = BatchWriter(db_engine=engine, table=TradesTable, batch_size=10, flush_interval=1, columns=Fill._fields)
+    writer._rows = fills(5)
+
+    async def main():
+        flush = asyncio.ensure_future(writer.flush())
+        await asyncio.sleep(0.01)
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+    run(main())
+    assert writer.pending == 5
+    assert writer.stats['rows'] == 0
+    assert written(engine) == []
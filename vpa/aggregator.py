@@ -0,0 +1,149 @@
+import asyncio
+import logging
+
+from vpa.db import profile
+from vpa.db.minutes import RESOLUTIONS, truncate, upsert
+from vpa.db.trades import TradeMapper
+
+
+logger = logging.getLogger(__name__)
+
+
+def empty_bucket():
+    return {
+        'vsell': 0,
+        'vbuy': 0,
+        'nsell': 0,
+        'nbuy': 0,
+        'ratesell': None,
+        'ratebuy': None
+    }
+
+
+def merge_bucket(bucket, other):
+    bucket['vsell'] += other['vsell']
+    bucket['vbuy'] += other['vbuy']
+    bucket['nsell'] += other['nsell']
+    bucket['nbuy'] += other['nbuy']
+    if other['ratesell'] is not None:
+        bucket['ratesell'] = other['ratesell']
+    if other['ratebuy'] is not None:
+        bucket['ratebuy'] = other['ratebuy']
+
+
+def rollup(buckets, resolution):
+    """
+    Merges minute buckets into buckets of `resolution` seconds.
+    """
+    result = {}
+    for (market, timestamp), bucket in sorted(buckets.items(), key=lambda i: i[0][1]):
+        key = (market, truncate(timestamp, resolution))
+        if key not in result:
+            result[key] = empty_bucket()
+        merge_bucket(result[key], bucket)
+    return result
+
+
+class MinutesAggregator:
+    """
+    Keeps minute buckets up to date as fills arrive.
+    Buckets hold changes since the last flush, they are added to stored rows
+    (and to the 5m/1h/1d rollups) with a single upsert per table.
+    """
+
+    def __init__(self, db_engine, flush_interval):
+        self.db_engine = db_engine
+        self.flush_interval = flush_interval
+        self._buckets = {}
+
+    def add(self, market, order_type, rate, quantity, timestamp):
+        key = (market, timestamp.replace(second=0, microsecond=0))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = empty_bucket()
+        if order_type == TradeMapper.ORDER_TYPE_BUY:
+            bucket['vbuy'] += quantity
+            bucket['nbuy'] += 1
+            bucket['ratebuy'] = rate
+        elif order_type == TradeMapper.ORDER_TYPE_SELL:
+            bucket['vsell'] += quantity
+            bucket['nsell'] += 1
+            bucket['ratesell'] = rate
+
+    async def flush(self):
+        if not self._buckets:
+            return
+        buckets, self._buckets = self._buckets, {}
+        written = False
+        try:
+            async with self.db_engine.acquire() as conn:
+                async with conn.begin():
+                    for resolution, table in RESOLUTIONS:
+                        rows = [
+                            dict(bucket, market=market, timestamp=timestamp)
+                            for (market, timestamp), bucket in rollup(buckets, resolution).items()
+                        ]
+                        await conn.execute(upsert(table, rows))
+                written = True
+        finally:
+            if not written:
+                # error or cancellation, fills that arrived during the flush are newer, merge them on top
+                for key, bucket in self._buckets.items():
+                    if key in buckets:
+                        merge_bucket(buckets[key], bucket)
+                    else:
+                        buckets[key] = bucket
+                self._buckets = buckets
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Error while writing minutes: {}".format(e))
+
+
+class ProfileAggregator:
+    """
+    Volume per market, hour, order type and price bin (see vpa.db.profile).
+    Like MinutesAggregator, cells hold volume added since the last flush.
+    """
+
+    def __init__(self, db_engine, flush_interval):
+        self.db_engine = db_engine
+        self.flush_interval = flush_interval
+        self._cells = {}
+
+    def add(self, market, order_type, rate, quantity, timestamp):
+        if rate <= 0:
+            return
+        key = (market, truncate(timestamp, profile.RESOLUTION), order_type, profile.rate_bin(rate))
+        self._cells[key] = self._cells.get(key, 0) + quantity
+
+    async def flush(self):
+        if not self._cells:
+            return
+        cells, self._cells = self._cells, {}
+        written = False
+        try:
+            async with self.db_engine.acquire() as conn:
+                await conn.execute(profile.upsert([
+                    {'market': market, 'timestamp': timestamp, 'order_type': order_type, 'bin': n, 'volume': volume}
+                    for (market, timestamp, order_type, n), volume in cells.items()
+                ]))
+                written = True
+        finally:
+            if not written:
+                # error or cancellation, keep cells for the next attempt
+                for key, volume in self._cells.items():
+                    cells[key] = cells.get(key, 0) + volume
+                self._cells = cells
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Error while writing volume profile: {}".format(e))
@@ -0,0 +1,234 @@
+import argparse
+import csv
+import datetime
+import json
+import multiprocessing
+import time
+
+import dateutil.parser
+import numpy
+import psycopg2
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from vpa.bl import StrategyRegistry
+from vpa.bl.base import Decision
+from vpa.db import pg_dsn
+from vpa.db.trades import TradeMapper, TradesTable
+
+
+FETCH_SIZE = 10000
+
+
+class TradesArrays:
+    """
+    Trades of a market as columns: datetime64[us] timestamps, uint8 order types
+    (positions in TradeMapper.ORDER_TYPES), float64 quantities and rates.
+    """
+
+    def __init__(self, timestamps, order_types, quantities, rates):
+        self.timestamps = timestamps
+        self.order_types = order_types
+        self.quantities = quantities
+        self.rates = rates
+
+    def __len__(self):
+        return len(self.rates)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        rows are (timestamp, order_type, quantity, rate) tuples.
+        """
+        codes = {order_type: i for i, order_type in enumerate(TradeMapper.ORDER_TYPES)}
+        return cls(
+            timestamps=numpy.array([row[0] for row in rows], dtype='datetime64[us]'),
+            order_types=numpy.array([codes.get(row[1], 255) for row in rows], dtype=numpy.uint8),
+            quantities=numpy.array([row[2] for row in rows], dtype=numpy.float64),
+            rates=numpy.array([row[3] for row in rows], dtype=numpy.float64)
+        )
+
+
+def load_db(market, start, stop):
+    query = sa.select([
+        TradesTable.c.timestamp,
+        TradesTable.c.order_type,
+        TradesTable.c.quantity,
+        TradesTable.c.rate
+    ]).where(
+        sa.and_(
+            TradesTable.c.market == market,
+            TradesTable.c.timestamp >= start,
+            TradesTable.c.timestamp < stop
+        )
+    ).order_by(TradesTable.c.timestamp)
+    compiled = query.compile(dialect=postgresql.dialect())
+
+    rows = []
+    with psycopg2.connect(pg_dsn()) as conn:
+        with conn.cursor(name='backtest') as cursor:
+            cursor.itersize = FETCH_SIZE
+            cursor.execute(str(compiled), compiled.params)
+            for row in cursor:
+                rows.append(row)
+    return TradesArrays.from_rows(rows)
+
+
+def load_file(path, market, start, stop):
+    """
+    Reads a file saved from the export endpoint (.arrow, .ndjson or .csv).
+    """
+    if path.endswith('.arrow'):
+        import pyarrow
+        with open(path, 'rb') as f:
+            table = pyarrow.RecordBatchStreamReader(f).read_all()
+        markets = numpy.array(table.column('market').to_pylist())
+        timestamps = table.column('timestamp').to_numpy()
+        mask = (
+            (markets == market) &
+            (timestamps >= numpy.datetime64(start, 'us')) &
+            (timestamps < numpy.datetime64(stop, 'us'))
+        )
+        result = TradesArrays(
+            timestamps=timestamps[mask],
+            order_types=table.column('order_type').to_numpy()[mask],
+            quantities=table.column('quantity').to_numpy()[mask],
+            rates=table.column('rate').to_numpy()[mask]
+        )
+        order = numpy.argsort(result.timestamps, kind='mergesort')
+        return TradesArrays(
+            timestamps=result.timestamps[order],
+            order_types=result.order_types[order],
+            quantities=result.quantities[order],
+            rates=result.rates[order]
+        )
+
+    with open(path) as f:
+        if path.endswith('.csv'):
+            items = csv.DictReader(f)
+        else:
+            items = (json.loads(line) for line in f if line.strip())
+        rows = []
+        for item in items:
+            if item['market'] != market:
+                continue
+            timestamp = dateutil.parser.parse(item['timestamp'])
+            if start <= timestamp < stop:
+                rows.append((timestamp, item['order_type'], float(item['quantity']), float(item['rate'])))
+    rows.sort(key=lambda i: i[0])
+    return TradesArrays.from_rows(rows)
+
+
+def replay(strategy, trades):
+    """
+    Feeds trades one by one, returns `do` for every trade.
+    """
+    result = numpy.zeros(len(trades), dtype=numpy.int8)
+    order_types = [
+        TradeMapper.ORDER_TYPES[code] if code < len(TradeMapper.ORDER_TYPES) else None
+        for code in trades.order_types.tolist()
+    ]
+    for i, (timestamp, order_type, quantity, rate) in enumerate(zip(
+            trades.timestamps.tolist(), order_types, trades.quantities.tolist(), trades.rates.tolist())):
+        decision = strategy.add_trade(timestamp=timestamp, order_type=order_type, quantity=quantity, rate=rate)
+        if decision is not None and decision.do:
+            result[i] = decision.do
+    return result
+
+
+def simulate(decisions, rates):
+    """
+    Buys when flat and sells when holding, at the trade rate.
+    Returns (number of closed positions, profit in percents), an open position is valued at the last rate.
+    """
+    closed = 0
+    profit = 0.0
+    bought = None
+    for i in numpy.flatnonzero(decisions).tolist():
+        if decisions[i] == Decision.BUY and bought is None:
+            bought = rates[i]
+        elif decisions[i] == Decision.SELL and bought is not None:
+            profit += (rates[i] - bought) / bought
+            closed += 1
+            bought = None
+    if bought is not None and len(rates):
+        profit += (rates[-1] - bought) / bought
+    return closed, profit * 100
+
+
+def run_market(strategy_name, market, start, stop, path=None):
+    started = time.time()
+    if path:
+        trades = load_file(path=path, market=market, start=start, stop=stop)
+    else:
+        trades = load_db(market=market, start=start, stop=stop)
+    loaded = time.time()
+
+    strategy = StrategyRegistry.get(strategy_name)()
+    decisions = strategy.decide_vectorized(
+        timestamps=trades.timestamps,
+        order_types=trades.order_types,
+        quantities=trades.quantities,
+        rates=trades.rates
+    )
+    vectorized = decisions is not None
+    if not vectorized:
+        decisions = replay(strategy=strategy, trades=trades)
+    closed, profit = simulate(decisions=decisions, rates=trades.rates)
+
+    return {
+        'market': market,
+        'trades': len(trades),
+        'buys': int(numpy.count_nonzero(decisions == Decision.BUY)),
+        'sells': int(numpy.count_nonzero(decisions == Decision.SELL)),
+        'closed': closed,
+        'profit': profit,
+        'vectorized': vectorized,
+        'load_time': loaded - started,
+        'run_time': time.time() - loaded
+    }
+
+
+def _run_market(args):
+    return run_market(*args)
+
+
+def parse_args(arguments):
+    parser = argparse.ArgumentParser(prog='manage.py backtest')
+    parser.add_argument('strategy', choices=sorted(StrategyRegistry.list()))
+    parser.add_argument('markets', help="comma separated, e.g. BTC-ETH,BTC-LTC")
+    parser.add_argument('--start', type=dateutil.parser.parse)
+    parser.add_argument('--stop', type=dateutil.parser.parse)
+    parser.add_argument('--file', help="export file (.arrow, .ndjson or .csv) instead of the database")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args(arguments)
+    if args.stop is None:
+        args.stop = datetime.datetime.utcnow()
+    if args.start is None:
+        args.start = args.stop - datetime.timedelta(days=1)
+    return args
+
+
+def main(arguments):
+    args = parse_args(arguments)
+    markets = args.markets.split(',')
+
+    with multiprocessing.Pool(processes=min(args.workers, len(markets))) as pool:
+        results = pool.map(_run_market, [
+            (args.strategy, market, args.start, args.stop, args.file) for market in markets
+        ])
+
+    row_format = '{:<12} {:>10} {:>8} {:>8} {:>7} {:>10} {:>8} {:>8}'
+    print(row_format.format('market', 'trades', 'buys', 'sells', 'closed', 'profit %', 'load s', 'run s'))
+    for result in results:
+        print(row_format.format(
+            result['market'],
+            result['trades'],
+            result['buys'],
+            result['sells'],
+            result['closed'],
+            '{:.2f}'.format(result['profit']),
+            '{:.2f}'.format(result['load_time']),
+            '{:.2f}'.format(result['run_time'])
+        ))
+    print("Total profit: {:.2f}%".format(sum(r['profit'] for r in results)))
@@ -0,0 +1,101 @@
+import datetime
+import json
+import random
+import time
+
+import dateutil.parser
+
+from vpa import decode
+
+
+def generate_frames(count, markets=20, fills=3, orders=10):
+    """
+    updateExchangeState frames shaped like Bittrex ones.
+    """
+    frames = []
+    now = datetime.datetime.utcnow()
+    for n in range(count):
+        market = 'BTC-A{}'.format(n % markets)
+        rate = 0.01 * (1 + random.random())
+        timestamp = now + datetime.timedelta(milliseconds=n * 10)
+        frames.append(json.dumps({
+            'C': 'd-{}'.format(n),
+            'M': [{
+                'H': 'CoreHub',
+                'M': 'updateExchangeState',
+                'A': [{
+                    'MarketName': market,
+                    'Nounce': n,
+                    'Buys': [
+                        {'Type': random.randint(0, 2), 'Rate': rate * 0.99, 'Quantity': random.random() * 100}
+                        for _ in range(orders)
+                    ],
+                    'Sells': [
+                        {'Type': random.randint(0, 2), 'Rate': rate * 1.01, 'Quantity': random.random() * 100}
+                        for _ in range(orders)
+                    ],
+                    'Fills': [{
+                        'OrderType': random.choice(('BUY', 'SELL')),
+                        'Rate': rate,
+                        'Quantity': random.random() * 100,
+                        'TimeStamp': timestamp.isoformat()[:23]
+                    } for _ in range(fills)]
+                }]
+            }]
+        }))
+    return frames
+
+
+def decode_baseline(data):
+    """
+    The previous pipeline: stdlib json, dateutil and a dict per fill.
+    """
+    result = []
+    data = json.loads(data)
+    if 'M' in data:
+        for block in data['M']:
+            if block['M'] == 'updateExchangeState':
+                for change in block['A']:
+                    trades = change['Fills']
+                    if trades:
+                        result.append((change['MarketName'], [{
+                            'market': change['MarketName'],
+                            'order_type': trade['OrderType'],
+                            'rate': trade['Rate'],
+                            'quantity': trade['Quantity'],
+                            'timestamp': dateutil.parser.parse(trade['TimeStamp'])
+                        } for trade in trades]))
+    return result
+
+
+def measure(function, frames, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for frame in frames:
+            function(frame)
+        duration = time.perf_counter() - started
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def main(path=None, count=20000, repeat=3):
+    """
+    Decodes recorded frames (a frame per line, see SOCKET_RECORD_FILE) or generated ones.
+    """
+    if path:
+        with open(path) as f:
+            frames = [line.rstrip('\n') for line in f if line.strip()]
+    else:
+        frames = generate_frames(count=count)
+
+    fills = sum(len(f) for frame in frames for _, f in decode.decode_frame(frame))
+    baseline = measure(decode_baseline, frames, repeat)
+    fast = measure(decode.decode_frame, frames, repeat)
+
+    print("{} frames, {} fills, json backend: {}".format(len(frames), fills, decode.loads.__module__))
+    for name, duration in (('baseline', baseline), ('decode_frame', fast)):
+        print("{:<14} {:>8.3f}s {:>10.0f} frames/s {:>10.0f} fills/s".format(
+            name, duration, len(frames) / duration, fills / duration
+        ))
+    print("speedup: {:.1f}x".format(baseline / fast))
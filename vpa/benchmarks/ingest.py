@@ -0,0 +1,167 @@
+import argparse
+import datetime
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import numpy
+import psycopg2
+
+from vpa.benchmarks import signalr
+from vpa.db import pg_dsn
+from vpa.db.levels import LevelsTable
+from vpa.db.minutes import RESOLUTIONS
+from vpa.db.profile import ProfileTable
+from vpa.db.trades import TradesTable
+
+
+POLL_INTERVAL = 0.2  # seconds, latency resolution
+LOOKBACK = 10000  # trade ids, rows of concurrent transactions can commit out of id order
+MARKETS_LIKE = 'BENCH-%'
+
+
+def parse_args(arguments):
+    parser = argparse.ArgumentParser(prog='manage.py bench_ingest')
+    parser.add_argument('--markets', type=int, default=100)
+    parser.add_argument('--rates', default='500,1000,2000,5000,10000', help="fills/s steps, comma separated")
+    parser.add_argument('--duration', type=float, default=30, help="seconds per step")
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--fills-per-frame', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=2, help="p95 latency budget, seconds")
+    parser.add_argument('--grace', type=float, default=10, help="seconds to wait for rows after the last step")
+    return parser.parse_args(arguments)
+
+
+def cleanup(conn):
+    """
+    Removes benchmark markets rows.
+    """
+    with conn.cursor() as cursor:
+        for table in [TradesTable, ProfileTable, LevelsTable] + [table for _, table in RESOLUTIONS]:
+            cursor.execute('DELETE FROM {} WHERE market LIKE %s'.format(table.name), (MARKETS_LIKE,))
+    conn.commit()
+
+
+def poll(conn, last_id, seen, arrivals):
+    """
+    Appends (fill timestamp, latency seconds) of new rows to arrivals, returns max trade_id.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            'SELECT trade_id, timestamp FROM trades WHERE market LIKE %s AND trade_id > %s',
+            (MARKETS_LIKE, last_id - LOOKBACK)
+        )
+        rows = cursor.fetchall()
+    conn.commit()
+    now = datetime.datetime.utcnow()
+    for trade_id, timestamp in rows:
+        if trade_id not in seen:
+            seen.add(trade_id)
+            arrivals.append((timestamp, (now - timestamp).total_seconds()))
+            last_id = max(last_id, trade_id)
+    return last_id
+
+
+def summarize(step, arrivals, latency_budget):
+    started = datetime.datetime.utcfromtimestamp(step['started'])
+    stopped = datetime.datetime.utcfromtimestamp(step['started'] + step['duration'])
+    latencies = numpy.array([latency for timestamp, latency in arrivals if started <= timestamp < stopped])
+    # rows that arrived within the latency budget count as ingested in time
+    ingested = int((latencies <= latency_budget).sum())
+    result = {
+        'rate': step['rate'],
+        'emitted': step['emitted'] / step['duration'],
+        'ingested': ingested / step['duration'],
+        'rows': len(latencies),
+        'p50': None,
+        'p95': None,
+        'p99': None
+    }
+    if len(latencies):
+        result['p50'], result['p95'], result['p99'] = numpy.percentile(latencies, [50, 95, 99])
+    result['behind'] = result['p95'] is None or result['p95'] > latency_budget or \
+        result['ingested'] < result['emitted'] * 0.95
+    return result
+
+
+def main(arguments):
+    """
+    Runs a fake SignalR server and a watcher against it, increases fill rate step by step
+    and reports fills/s written to Postgres and fill timestamp to visible row latency.
+    """
+    args = parse_args(arguments)
+    rates = [int(rate) for rate in args.rates.split(',')]
+    markets = signalr.market_names(args.markets)
+
+    conn = psycopg2.connect(pg_dsn())
+    cleanup(conn)
+
+    queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=signalr.run, kwargs=dict(
+        port=args.port,
+        markets=args.markets,
+        rates=rates,
+        duration=args.duration,
+        queue=queue,
+        fills_per_frame=args.fills_per_frame
+    ))
+    server.start()
+    time.sleep(1)
+
+    watcher = subprocess.Popen(
+        [sys.executable, 'manage.py', 'watch', ','.join(markets), '--shards', str(args.shards)],
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+        env=dict(
+            os.environ,
+            BITTREX_SOCKET_URL='http://127.0.0.1:{}/signalr/'.format(args.port),
+            BITTREX_CLOUDFLARE='off'
+        )
+    )
+
+    steps = []
+    arrivals = []
+    seen = set()
+    last_id = 0
+    try:
+        finished = None
+        while finished is None or time.time() < finished + args.grace:
+            last_id = poll(conn, last_id, seen, arrivals)
+            while finished is None and not queue.empty():
+                step = queue.get()
+                if step is None:
+                    finished = time.time()
+                else:
+                    steps.append(step)
+            if watcher.poll() is not None:
+                raise RuntimeError("Watcher exited with code {}.".format(watcher.returncode))
+            time.sleep(POLL_INTERVAL)
+    finally:
+        watcher.terminate()
+        watcher.wait()
+        server.terminate()
+        server.join()
+        cleanup(conn)
+        conn.close()
+
+    print("{} markets, {} shards, {} fills per frame, {}s per step".format(
+        args.markets, args.shards, args.fills_per_frame, args.duration
+    ))
+    print("{:>8} {:>10} {:>10} {:>8} {:>8} {:>8}".format('rate', 'emitted/s', 'ingested/s', 'p50', 'p95', 'p99'))
+    behind = None
+    for step in steps:
+        result = summarize(step, arrivals, args.latency)
+        print("{rate:>8} {emitted:>10.0f} {ingested:>10.0f} {p50:>8} {p95:>8} {p99:>8}{mark}".format(
+            mark=' behind' if result['behind'] else '',
+            **dict(result, **{
+                key: '-' if result[key] is None else '{:.3f}'.format(result[key]) for key in ('p50', 'p95', 'p99')
+            })
+        ))
+        if result['behind'] and behind is None:
+            behind = result['rate']
+    if behind is None:
+        print("Watcher kept up with all rates.")
+    else:
+        print("Watcher falls behind at {} fills/s.".format(behind))
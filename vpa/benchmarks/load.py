@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import subprocess
+import time
+
+import aiohttp
+import numpy
+
+from vpa import settings
+from vpa.benchmarks.seed import market_names
+
+
+ROUTES = {
+    'market': '/markets/{market}',
+    'bubbles': '/markets/{market}/bubbles',
+    'analysis': '/markets/{market}/analysis?period=24',
+    'minutes': '/markets/{market}/minutes?period=24',
+    'minutes_30d': '/markets/{market}/minutes?period=720',
+    'export': '/markets/{market}/export?format=ndjson&period=1',
+    'flow': '/markets/{market}/flow?period=336',
+    'levels': '/markets/{market}/levels'
+}
+
+
+def parse_args(arguments):
+    parser = argparse.ArgumentParser(prog='manage.py bench_load')
+    parser.add_argument('--url', default='http://localhost:{}'.format(settings.SERVER_PORT))
+    parser.add_argument('--markets', type=int, default=10, help="first N seeded markets")
+    parser.add_argument('--routes', default=','.join(sorted(ROUTES)), help="comma separated")
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30, help="seconds")
+    parser.add_argument('--output', default='bench_load.json')
+    return parser.parse_args(arguments)
+
+
+def version():
+    try:
+        output = subprocess.check_output(['git', 'describe', '--always', '--dirty'], stderr=subprocess.DEVNULL)
+        return output.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def worker(session, url, routes, markets, stop, results):
+    while time.time() < stop:
+        route = random.choice(routes)
+        started = time.perf_counter()
+        try:
+            async with session.get(url + ROUTES[route].format(market=random.choice(markets))) as r:
+                await r.read()
+                ok = r.status == 200
+        except aiohttp.ClientError:
+            ok = False
+        results[route].append((time.perf_counter() - started, ok))
+
+
+def summarize(results, duration):
+    summary = {}
+    for route, samples in sorted(results.items()):
+        latencies = numpy.array([latency for latency, ok in samples if ok])
+        summary[route] = {
+            'requests': len(samples),
+            'errors': len(samples) - len(latencies),
+            'rps': len(samples) / duration,
+            'p50': None,
+            'p95': None,
+            'p99': None
+        }
+        if len(latencies):
+            p50, p95, p99 = numpy.percentile(latencies, [50, 95, 99])
+            summary[route].update(p50=float(p50), p95=float(p95), p99=float(p99))
+    return summary
+
+
+async def run(url, routes, markets, concurrency, duration):
+    results = {route: [] for route in routes}
+    stop = time.time() + duration
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*[
+            worker(session, url, routes, markets, stop, results) for _ in range(concurrency)
+        ])
+    return results
+
+
+def main(arguments):
+    """
+    Requests random routes for random seeded markets with `concurrency` clients,
+    prints and saves per route throughput and latency percentiles.
+    """
+    args = parse_args(arguments)
+    routes = args.routes.split(',')
+    for route in routes:
+        if route not in ROUTES:
+            raise ValueError("Unknown route: {}.".format(route))
+
+    started = time.time()
+    results = asyncio.get_event_loop().run_until_complete(run(
+        url=args.url.rstrip('/'),
+        routes=routes,
+        markets=market_names(args.markets),
+        concurrency=args.concurrency,
+        duration=args.duration
+    ))
+    duration = time.time() - started
+    summary = summarize(results, duration)
+
+    print("{:<12} {:>8} {:>6} {:>8} {:>8} {:>8} {:>8}".format(
+        'route', 'requests', 'errors', 'rps', 'p50', 'p95', 'p99'
+    ))
+    for route, stats in summary.items():
+        print("{route:<12} {requests:>8} {errors:>6} {rps:>8.1f} {p50:>8} {p95:>8} {p99:>8}".format(
+            route=route,
+            **dict(stats, **{
+                key: '-' if stats[key] is None else '{:.3f}'.format(stats[key]) for key in ('p50', 'p95', 'p99')
+            })
+        ))
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'version': version(),
+            'timestamp': datetime.datetime.utcnow().isoformat(),
+            'url': args.url,
+            'markets': args.markets,
+            'concurrency': args.concurrency,
+            'duration': duration,
+            'routes': summary
+        }, f, indent=2)
+    print("Results saved to {}.".format(args.output))
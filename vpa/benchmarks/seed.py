@@ -0,0 +1,202 @@
+import argparse
+import datetime
+import io
+import multiprocessing
+import time
+
+import numpy
+import psycopg2
+
+from vpa import settings
+from vpa.db import pg_dsn
+from vpa.db.minutes import RESOLUTIONS, MinutesTable
+from vpa.db.partitions import create_partition_statements, default_partition_ddl
+from vpa.db.profile import BIN_STEP, ProfileTable
+from vpa.db.trades import TradeMapper, TradesTable
+
+
+MARKETS_LIKE = 'SEED-%'
+CHUNK_SIZE = 200000  # trades per COPY
+
+MINUTES_SQL = """
+    INSERT INTO {minutes} (market, timestamp, vsell, vbuy, nsell, nbuy, ratesell, ratebuy)
+    SELECT
+        market,
+        date_trunc('minute', timestamp),
+        coalesce(sum(quantity) FILTER (WHERE order_type = '{sell}'), 0),
+        coalesce(sum(quantity) FILTER (WHERE order_type = '{buy}'), 0),
+        count(*) FILTER (WHERE order_type = '{sell}'),
+        count(*) FILTER (WHERE order_type = '{buy}'),
+        (array_agg(rate ORDER BY timestamp DESC) FILTER (WHERE order_type = '{sell}'))[1],
+        (array_agg(rate ORDER BY timestamp DESC) FILTER (WHERE order_type = '{buy}'))[1]
+    FROM {trades}
+    WHERE market = %s
+    GROUP BY 1, 2
+"""
+
+ROLLUP_SQL = """
+    INSERT INTO {name} (market, timestamp, vsell, vbuy, nsell, nbuy, ratesell, ratebuy)
+    SELECT
+        market,
+        to_timestamp(floor(extract(epoch FROM timestamp) / {resolution}) * {resolution}) AT TIME ZONE 'UTC',
+        sum(vsell),
+        sum(vbuy),
+        sum(nsell),
+        sum(nbuy),
+        (array_agg(ratesell ORDER BY timestamp DESC) FILTER (WHERE ratesell IS NOT NULL))[1],
+        (array_agg(ratebuy ORDER BY timestamp DESC) FILTER (WHERE ratebuy IS NOT NULL))[1]
+    FROM {minutes}
+    WHERE market = %s
+    GROUP BY 1, 2
+"""
+
+PROFILE_SQL = """
+    INSERT INTO {profile} (market, timestamp, order_type, bin, volume)
+    SELECT market, date_trunc('hour', timestamp), order_type, floor(ln(rate) / ln(1 + {step})), sum(quantity)
+    FROM {trades}
+    WHERE market = %s
+    GROUP BY 1, 2, 3, 4
+"""
+
+
+def market_names(count):
+    return ['SEED-{:04d}'.format(n) for n in range(count)]
+
+
+def parse_args(arguments):
+    parser = argparse.ArgumentParser(prog='manage.py seed')
+    parser.add_argument('--markets', type=int, default=100)
+    parser.add_argument('--trades', type=int, default=10 ** 8, help="total for all markets")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--jobs', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--random-seed', type=int, default=0)
+    return parser.parse_args(arguments)
+
+
+def market_sizes(markets, trades):
+    """
+    Trades per market, a few markets are much busier than the rest (Zipf-like).
+    """
+    weights = 1 / numpy.arange(1, markets + 1)
+    return numpy.floor(weights / weights.sum() * trades).astype(numpy.int64)
+
+
+def generate(count, start, stop, rate, random):
+    """
+    Sorted timestamps, order types, rates and quantities of `count` trades.
+    Buys move the rate up and sells move it down.
+    """
+    span = int((stop - start).total_seconds() * 10 ** 6)
+    timestamps = numpy.datetime64(start, 'us') + numpy.sort(random.randint(0, span, count)).astype('timedelta64[us]')
+    buys = random.random_sample(count) < 0.5
+    steps = numpy.abs(random.normal(0, 0.001, count)) * numpy.where(buys, 1, -1)
+    rates = rate * numpy.exp(numpy.cumsum(steps))
+    quantities = random.lognormal(mean=2, sigma=1.5, size=count)
+    order_types = numpy.where(buys, TradeMapper.ORDER_TYPE_BUY, TradeMapper.ORDER_TYPE_SELL)
+    return timestamps, order_types, rates, quantities
+
+
+def copy_trades(conn, market, timestamps, order_types, rates, quantities):
+    data = io.StringIO()
+    for row in zip(numpy.datetime_as_string(timestamps).tolist(), order_types.tolist(), rates.tolist(),
+                   quantities.tolist()):
+        data.write('{},{},{!r},{!r},{}\n'.format(market, row[1], row[2], row[3], row[0]))
+    data.seek(0)
+    with conn.cursor() as cursor:
+        cursor.copy_expert(
+            'COPY {} (market, order_type, rate, quantity, timestamp) FROM STDIN WITH CSV'.format(TradesTable.name),
+            data
+        )
+
+
+def seed_market(market, count, start, stop, random_seed):
+    """
+    Writes trades of a market, then its minutes, rollups and volume profile.
+    """
+    random = numpy.random.RandomState(random_seed)
+    rate = 10 ** random.uniform(-6, 0)
+    conn = psycopg2.connect(pg_dsn())
+    try:
+        # chunks cover consecutive time ranges, so timestamps stay sorted
+        chunks = max(1, -(-count // CHUNK_SIZE))
+        span = (stop - start) / chunks
+        for n in range(chunks):
+            size = count // chunks + (1 if n < count % chunks else 0)
+            timestamps, order_types, rates, quantities = generate(
+                count=size,
+                start=start + span * n,
+                stop=start + span * (n + 1),
+                rate=rate,
+                random=random
+            )
+            copy_trades(conn, market, timestamps, order_types, rates, quantities)
+            conn.commit()
+            rate = rates[-1] if size else rate
+
+        with conn.cursor() as cursor:
+            cursor.execute(MINUTES_SQL.format(
+                minutes=MinutesTable.name,
+                trades=TradesTable.name,
+                buy=TradeMapper.ORDER_TYPE_BUY,
+                sell=TradeMapper.ORDER_TYPE_SELL
+            ), (market,))
+            for resolution, table in RESOLUTIONS[1:]:
+                cursor.execute(ROLLUP_SQL.format(
+                    name=table.name,
+                    minutes=MinutesTable.name,
+                    resolution=resolution
+                ), (market,))
+            cursor.execute(PROFILE_SQL.format(
+                profile=ProfileTable.name,
+                trades=TradesTable.name,
+                step=BIN_STEP
+            ), (market,))
+        conn.commit()
+    finally:
+        conn.close()
+    return market, count
+
+
+def prepare(days):
+    """
+    Removes previously seeded rows and creates partitions for the seeded range.
+    """
+    today = datetime.datetime.utcnow().date()
+    conn = psycopg2.connect(pg_dsn())
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(default_partition_ddl())
+            for i in range(-days, settings.PARTITIONS_AHEAD + 1):
+                for sql, params in create_partition_statements(today + datetime.timedelta(days=i)):
+                    cursor.execute(sql, params)
+            for table in [TradesTable, ProfileTable] + [table for _, table in RESOLUTIONS]:
+                cursor.execute('DELETE FROM {} WHERE market LIKE %s'.format(table.name), (MARKETS_LIKE,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main(arguments):
+    """
+    Seeds synthetic trades, minutes and rollups for SEED-* markets, one process per market at a time.
+    """
+    args = parse_args(arguments)
+    stop = datetime.datetime.utcnow()
+    start = stop - datetime.timedelta(days=args.days)
+    markets = market_names(args.markets)
+    sizes = market_sizes(args.markets, args.trades)
+
+    prepare(days=args.days)
+
+    started = time.time()
+    total = 0
+    with multiprocessing.Pool(args.jobs) as pool:
+        for market, count in pool.starmap(seed_market, [
+            (market, int(size), start, stop, args.random_seed + n)
+            for n, (market, size) in enumerate(zip(markets, sizes))
+        ]):
+            total += count
+    duration = time.time() - started
+    print("{} trades for {} markets seeded in {:.1f}s ({:.0f} trades/s).".format(
+        total, len(markets), duration, total / duration
+    ))
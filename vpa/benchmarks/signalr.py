@@ -0,0 +1,145 @@
+import asyncio
+import datetime
+import json
+import random
+import time
+
+from aiohttp import web
+
+
+TICK = 0.02  # seconds between frame bursts
+
+
+def market_names(count):
+    return ['BENCH-{:04d}'.format(n) for n in range(count)]
+
+
+async def negotiate_handler(request):
+    return web.json_response({
+        'ProtocolVersion': '1.5',
+        'ConnectionToken': 'bench-{}'.format(random.randint(0, 10 ** 9))
+    })
+
+
+async def read_subscriptions(ws, tickers):
+    async for msg in ws:
+        if msg.type == web.WSMsgType.TEXT:
+            message = json.loads(msg.data)
+            if message.get('M') == 'SubscribeToExchangeDeltas':
+                tickers.extend(message['A'])
+                await ws.send_str(json.dumps({'R': True, 'I': message['I']}))
+
+
+def make_frame(market, fills, nounce):
+    rate = 0.01 * (1 + random.random())
+    timestamp = datetime.datetime.utcnow().isoformat()
+    return json.dumps({
+        'C': 'd-{}'.format(nounce),
+        'M': [{
+            'H': 'CoreHub',
+            'M': 'updateExchangeState',
+            'A': [{
+                'MarketName': market,
+                'Nounce': nounce,
+                'Buys': [],
+                'Sells': [],
+                'Fills': [{
+                    'OrderType': random.choice(('BUY', 'SELL')),
+                    'Rate': rate,
+                    'Quantity': random.random() * 100,
+                    'TimeStamp': timestamp
+                } for _ in range(fills)]
+            }]
+        }]
+    })
+
+
+async def connect_handler(request):
+    """
+    Emits updateExchangeState frames for subscribed tickers following app['steps'].
+    """
+    app = request.app
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    tickers = []
+    reader = asyncio.ensure_future(read_subscriptions(ws, tickers))
+
+    if app['started'] is None:
+        app['started'] = time.time() + app['warmup']
+        app['ready'].set()
+
+    nounce = 0
+    step = None
+    emitted = 0
+    try:
+        while not ws.closed:
+            await asyncio.sleep(TICK)
+            elapsed = time.time() - app['started']
+            if elapsed < 0 or not tickers:
+                continue
+            current = int(elapsed // app['duration'])
+            if current >= len(app['rates']):
+                break
+            if current != step:
+                step, emitted = current, 0
+            share = len(tickers) / len(app['markets'])
+            target = int(app['rates'][step] * share * (elapsed - step * app['duration']))
+            count = target - emitted
+            while count > 0:
+                fills = min(count, app['fills_per_frame'])
+                await ws.send_str(make_frame(tickers[nounce % len(tickers)], fills, nounce))
+                nounce += 1
+                count -= fills
+                emitted += fills
+                app['emitted'][step] += fills
+        # keep the connection open, so the watcher does not reconnect while results are collected
+        await reader
+    finally:
+        reader.cancel()
+    return ws
+
+
+async def report(app):
+    """
+    Puts a dict per finished step into app['queue'], None at the end.
+    """
+    await app['ready'].wait()
+    for step, rate in enumerate(app['rates']):
+        started = app['started'] + step * app['duration']
+        await asyncio.sleep(max(0, started + app['duration'] - time.time()) + TICK * 2)
+        app['queue'].put({
+            'step': step,
+            'rate': rate,
+            'started': started,
+            'duration': app['duration'],
+            'emitted': app['emitted'][step]
+        })
+    app['queue'].put(None)
+
+
+async def start_report(app):
+    app['report'] = asyncio.ensure_future(report(app))
+
+
+def run(port, markets, rates, duration, queue, fills_per_frame=3, warmup=5):
+    """
+    Fake Bittrex SignalR endpoints: /signalr/negotiate and /signalr/connect.
+    rates are total fills/s for all markets, each one lasts duration seconds.
+    Emission starts warmup seconds after the first connection.
+    """
+    app = web.Application()
+    app['markets'] = market_names(markets)
+    app['rates'] = rates
+    app['duration'] = duration
+    app['fills_per_frame'] = fills_per_frame
+    app['warmup'] = warmup
+    app['queue'] = queue
+    app['started'] = None
+    app['ready'] = asyncio.Event()
+    app['emitted'] = [0] * len(rates)
+    app.on_startup.append(start_report)
+
+    app.router.add_get('/signalr/negotiate', negotiate_handler)
+    app.router.add_get('/signalr/connect', connect_handler)
+
+    web.run_app(app, host='127.0.0.1', port=port, print=None)
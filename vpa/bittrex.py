@@ -1,4 +1,5 @@
 import asyncio
+import fnmatch
 import json
 import logging
 import time
@@ -7,46 +8,114 @@ from urllib.parse import urlencode
 import aiohttp
 import cfscrape
 
+from vpa import settings
+from vpa.decode import decode_frame
+
 
 logger = logging.getLogger(__name__)
 
+MARKETS_URL = 'https://bittrex.com/api/v1.1/public/getmarkets'
+
+
+async def get_markets(patterns):
+    """
+    Active market names matching any of the patterns (e.g. BTC-*).
+    """
+    async with aiohttp.ClientSession() as session:
+        async with session.get(MARKETS_URL) as r:
+            data = await r.json()
+    return [
+        market['MarketName'] for market in data['result']
+        if market['IsActive'] and any(fnmatch.fnmatchcase(market['MarketName'], p) for p in patterns)
+    ]
+
+
+class CloudflareCookie:
+    """
+    Caches cfscrape cookie and user agent, negotiation runs in an executor to not block the loop.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._value = None
+        self._expires = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._value = None
+
+    async def get(self, url):
+        """
+        Returns (cookie_str, user_agent).
+        """
+        async with self._lock:
+            if self._value is None or time.time() > self._expires:
+                started = time.time()
+                self._value = await asyncio.get_event_loop().run_in_executor(None, cfscrape.get_cookie_string, url)
+                self._expires = time.time() + self.ttl
+                logger.info("Cloudflare cookie received in {:.3f}s.".format(time.time() - started))
+            return self._value
+
+
+cloudflare_cookie = CloudflareCookie(ttl=settings.CLOUDFLARE_COOKIE_TTL)
+
 
 class BittrexTradesSocket:
     """
     https://github.com/ericsomdahl/python-bittrex/blob/master/bittrex/bittrex.py
     https://bittrex.com/home/api
     """
-    SOCKET_URL = 'https://socket.bittrex.com/signalr/'
+    SOCKET_URL = settings.BITTREX_SOCKET_URL
     SOCKET_HUB = 'corehub'
     RECONNECT_TIMEOUT = 300
 
-    def __init__(self, tickers, on_trades):
+    def __init__(self, tickers, on_trades, name='socket', record=None):
         self.tickers = tickers
+        self.name = name
+        self.record = record  # file to save raw frames to
         self._ws = None
+        self._session = None
+        self._session_headers = None
         self._last_message = None
-        self.connected = False
+        self._stopped = False
         self.on_trades = on_trades
         self.listen_task = None
         self.connected = False
+        self.stats = {
+            'messages': 0,
+            'fills': 0,
+            'errors': 0,
+            'reconnects': 0,
+            'connect_time': None,
+            'max_connect_time': 0
+        }
+
+    def health(self):
+        return dict(
+            self.stats,
+            name=self.name,
+            tickers=len(self.tickers),
+            connected=self.connected,
+            idle=round(time.time() - self._last_message, 1) if self._last_message else None
+        )
 
     async def run(self):
         self.listen_task = asyncio.ensure_future(self._listen())
-        while True:
+        while not self._stopped:
             await asyncio.sleep(round(self.RECONNECT_TIMEOUT / 10))
-            if not self.connected:
+            if self._stopped:
                 break
-            if not self._ws:
+            if self.listen_task.done():
+                if not self.listen_task.cancelled() and self.listen_task.exception():
+                    logger.error("{}: connection failed: {}".format(self.name, self.listen_task.exception()))
+            elif not (self._last_message and time.time() - self._last_message > self.RECONNECT_TIMEOUT):
                 continue
-            if self._last_message and time.time() - self._last_message > self.RECONNECT_TIMEOUT:
-                if self._ws:
-                    await self._ws.close()
-                self.listen_task.cancel()
-                self._last_message = None
-                self._ws = None
-                self.listen_task = asyncio.ensure_future(self._listen())
-                logger.warning("Socket was reconnected.")
+            await self._close()
+            self.listen_task = asyncio.ensure_future(self._listen())
+            self.stats['reconnects'] += 1
+            logger.warning("{}: socket was reconnected.".format(self.name))
 
-    async def stop(self):
+    async def _close(self):
         self.connected = False
         self._last_message = None
         if self._ws:
@@ -55,6 +124,29 @@ class BittrexTradesSocket:
         if self.listen_task:
             self.listen_task.cancel()
 
+    async def stop(self):
+        self._stopped = True
+        await self._close()
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def _get_session(self, url):
+        """
+        Session is reused across reconnects while the cloudflare cookie is the same.
+        """
+        headers = {}
+        if settings.BITTREX_CLOUDFLARE:
+            cookie_str, user_agent = await cloudflare_cookie.get(url)
+            headers = {'User-Agent': user_agent, 'Cookie': cookie_str}
+        if self._session and headers != self._session_headers:
+            await self._session.close()
+            self._session = None
+        if self._session is None:
+            self._session = aiohttp.ClientSession(headers=headers)
+            self._session_headers = headers
+        return self._session
+
     async def _listen(self):
         """
         Uses signalr protocol: https://github.com/TargetProcess/signalr-client-py
@@ -68,50 +160,85 @@ class BittrexTradesSocket:
             'connectionData': conn_data,
             '_': round(time.time() * 1000)
         })
-        cookie_str, user_agent = cfscrape.get_cookie_string(url)
-        async with aiohttp.ClientSession(headers={'User-Agent': user_agent, 'Cookie': cookie_str}) as session:
+        started = time.time()
+        session = await self._get_session(url)
+        try:
             async with session.get(url) as r:
+                r.raise_for_status()
                 socket_conf = await r.json()
+        except Exception:
+            # cookie could be expired on the cloudflare side
+            cloudflare_cookie.invalidate()
+            raise
 
-            socket_url = self.SOCKET_URL.replace('https', 'wss') + 'connect' + '?' + urlencode({
-                'transport': 'webSockets',
-                'clientProtocol': socket_conf['ProtocolVersion'],
-                'connectionToken': socket_conf['ConnectionToken'],
-                'connectionData': conn_data,
-                'tid': 3
-            })
-            async with session.ws_connect(socket_url) as ws:
-                self._ws = ws
-                self.connected = True
-                for n, ticker in enumerate(self.tickers, start=1):
-                    message = {
-                        'H': self.SOCKET_HUB,
-                        'M': 'SubscribeToExchangeDeltas',
-                        'A': [ticker],
-                        'I': n
-                    }
-                    await ws.send_str(json.dumps(message))
-                async for msg in ws:
-                    if msg.type == aiohttp.WSMsgType.TEXT:
-                        self._last_message = time.time()
-                        try:
-                            data = json.loads(msg.data)
-                            if 'M' in data:
-                                for block in data['M']:
-                                    if block['M'] == 'updateExchangeState':
-                                        for change in block['A']:
-                                            trades = change['Fills']
-                                            if trades:
-                                                await self.on_trades(
-                                                    market=change['MarketName'],
-                                                    trades=trades
-                                                )
-                        except Exception as e:
-                            logger.error("Error while handling message: {}".format(e))
-                    elif msg.tp == aiohttp.WSMsgType.closed:
-                        break
-                    elif msg.tp == aiohttp.WSMsgType.error:
-                        break
-                    else:
-                        logger.warning("Message: {}".format(msg.tp))
-            self._ws = None
+        socket_url = self.SOCKET_URL.replace('http', 'ws', 1) + 'connect' + '?' + urlencode({
+            'transport': 'webSockets',
+            'clientProtocol': socket_conf['ProtocolVersion'],
+            'connectionToken': socket_conf['ConnectionToken'],
+            'connectionData': conn_data,
+            'tid': 3
+        })
+        async with session.ws_connect(socket_url) as ws:
+            self._ws = ws
+            self.connected = True
+            connect_time = time.time() - started
+            self.stats['connect_time'] = round(connect_time, 3)
+            self.stats['max_connect_time'] = max(self.stats['max_connect_time'], self.stats['connect_time'])
+            logger.info("{}: connected in {:.3f}s.".format(self.name, connect_time))
+            for n, ticker in enumerate(self.tickers, start=1):
+                message = {
+                    'H': self.SOCKET_HUB,
+                    'M': 'SubscribeToExchangeDeltas',
+                    'A': [ticker],
+                    'I': n
+                }
+                await ws.send_str(json.dumps(message))
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    self._last_message = time.time()
+                    self.stats['messages'] += 1
+                    if self.record:
+                        self.record.write(msg.data + '\n')
+                    try:
+                        for market, fills in decode_frame(msg.data):
+                            self.stats['fills'] += len(fills)
+                            await self.on_trades(market=market, trades=fills)
+                    except Exception as e:
+                        self.stats['errors'] += 1
+                        logger.error("{}: error while handling message: {}".format(self.name, e))
+                elif msg.type == aiohttp.WSMsgType.CLOSED:
+                    break
+                elif msg.type == aiohttp.WSMsgType.ERROR:
+                    break
+                else:
+                    logger.warning("{}: message: {}".format(self.name, msg.type))
+        self._ws = None
+        self.connected = False
+
+
+class BittrexShardedSocket:
+    """
+    Splits tickers across several connections, each one reconnects on its own.
+    All shards call the same on_trades.
+    """
+
+    def __init__(self, tickers, on_trades, shards, record=None):
+        shards = max(1, min(shards, len(tickers)))
+        self.sockets = [
+            BittrexTradesSocket(
+                tickers=tickers[i::shards],
+                on_trades=on_trades,
+                name='shard-{}'.format(i),
+                record=record
+            ) for i in range(shards)
+        ]
+
+    def health(self):
+        return [socket.health() for socket in self.sockets]
+
+    async def run(self):
+        await asyncio.gather(*[socket.run() for socket in self.sockets])
+
+    async def stop(self):
+        for socket in self.sockets:
+            await socket.stop()
@@ -1,3 +1,4 @@
 from .base import StrategyRegistry
 from .pump import PumpBuyStrategy
 from .trailing_stop import TrailingStopSellStrategy
+from .runner import StrategiesRunner
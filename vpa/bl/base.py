@@ -1,57 +1,151 @@
 from vpa.db.trades import TradeMapper
 
 
+class TradesBuffer:
+    """
+    Ring buffer of trades ordered by time, columns are kept in parallel preallocated lists.
+    Appending and evicting the oldest trade is O(1), range lookups are binary searches,
+    range volumes come from cumulative quantities.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._timestamps = [None] * size
+        self._quantities = [0.0] * size
+        self._rates = [0.0] * size
+        self._volumes = [0.0] * size  # cumulative quantity, including the trade
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def _pos(self, i):
+        return (self._start + i) % self.size
+
+    def timestamp(self, i):
+        return self._timestamps[self._pos(i)]
+
+    def quantity(self, i):
+        return self._quantities[self._pos(i)]
+
+    def rate(self, i):
+        return self._rates[self._pos(i)]
+
+    def bisect(self, timestamp):
+        """
+        Index of the first trade at or after the timestamp.
+        """
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestamps[self._pos(mid)] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def range(self, start, stop):
+        return self.bisect(start), self.bisect(stop)
+
+    def volume(self, lo, hi):
+        if hi <= lo:
+            return 0
+        first = self._pos(lo)
+        return self._volumes[self._pos(hi - 1)] - (self._volumes[first] - self._quantities[first])
+
+    def _set(self, i, timestamp, quantity, rate):
+        pos = self._pos(i)
+        previous = self._volumes[self._pos(i - 1)] if i else 0
+        self._timestamps[pos] = timestamp
+        self._quantities[pos] = quantity
+        self._rates[pos] = rate
+        self._volumes[pos] = previous + quantity
+
+    def append(self, timestamp, quantity, rate):
+        if self._count and timestamp < self.timestamp(self._count - 1):
+            self._insert(timestamp=timestamp, quantity=quantity, rate=rate)
+            return
+        if self._count == self.size:
+            self._start = self._pos(1)
+        else:
+            self._count += 1
+        self._set(self._count - 1, timestamp=timestamp, quantity=quantity, rate=rate)
+
+    def _insert(self, timestamp, quantity, rate):
+        """
+        Late trades are rare, shifting newer ones is O(n).
+        """
+        index = self.bisect(timestamp)
+        while index < self._count and not timestamp < self.timestamp(index):
+            index += 1
+        if self._count == self.size:
+            if index == 0:
+                return  # older than everything we keep
+            self._start = self._pos(1)
+            index -= 1
+        else:
+            self._count += 1
+        trades = [
+            (self.timestamp(i), self.quantity(i), self.rate(i))
+            for i in range(index, self._count - 1)
+        ]
+        self._set(index, timestamp=timestamp, quantity=quantity, rate=rate)
+        for i, (t, q, r) in enumerate(trades, start=index + 1):
+            self._set(i, timestamp=t, quantity=q, rate=r)
+
+
 class Trades:
 
-    STORAGE_LIMIT = 2000
+    STORAGE_LIMIT = 2000  # per order type
 
     def __init__(self):
-        self._trades = []
+        self._buffers = {
+            TradeMapper.ORDER_TYPE_BUY: TradesBuffer(size=self.STORAGE_LIMIT),
+            TradeMapper.ORDER_TYPE_SELL: TradesBuffer(size=self.STORAGE_LIMIT)
+        }
 
     def add_trade(self, timestamp, order_type, quantity, rate):
-        self._trades.append({
-            't': timestamp,
+        buffer = self._buffers.get(order_type)
+        if buffer is not None:
+            buffer.append(timestamp=timestamp, quantity=quantity, rate=rate)
+
+    def _get(self, order_type, start, stop):
+        buffer = self._buffers[order_type]
+        lo, hi = buffer.range(start=start, stop=stop)
+        return [{
+            't': buffer.timestamp(i),
             'ot': order_type,
-            'q': quantity,
-            'r': rate
-        })
-        if len(self._trades) > self.STORAGE_LIMIT:
-            self._trades = self._trades[round(self.STORAGE_LIMIT / 20):]
+            'q': buffer.quantity(i),
+            'r': buffer.rate(i)
+        } for i in range(lo, hi)]
 
     def get(self, start, stop):
-        sells = []
-        buys = []
-        for t in self._trades:
-            if stop > t['t'] >= start:
-                if t['ot'] == TradeMapper.ORDER_TYPE_BUY:
-                    buys.append(t)
-                elif t['ot'] == TradeMapper.ORDER_TYPE_SELL:
-                    sells.append(t)
-        buys = list(sorted(buys, key=lambda i: i['t']))
-        sells = list(sorted(sells, key=lambda i: i['t']))
         return {
-            'buys': buys,
-            'sells': sells
+            'buys': self._get(order_type=TradeMapper.ORDER_TYPE_BUY, start=start, stop=stop),
+            'sells': self._get(order_type=TradeMapper.ORDER_TYPE_SELL, start=start, stop=stop)
         }
 
     def get_stats(self, start, stop):
-        trades = self.get(start=start, stop=stop)
-        sells = trades['sells']
-        buys = trades['buys']
-        return {
-            'nsell': len(sells),
-            'nbuy': len(buys),
-            'vsell': sum([i['q'] for i in sells]),
-            'vbuy': sum([i['q'] for i in buys]),
-            'osell': sells[0]['r'],
-            'csell': sells[-1]['r'],
-            'obuy': buys[0]['r'],
-            'cbuy': buys[-1]['r']
-        }
+        """
+        Open/close rates are None if there are no trades of the type.
+        """
+        stats = {}
+        for suffix, order_type in (('sell', TradeMapper.ORDER_TYPE_SELL), ('buy', TradeMapper.ORDER_TYPE_BUY)):
+            buffer = self._buffers[order_type]
+            lo, hi = buffer.range(start=start, stop=stop)
+            stats['n' + suffix] = hi - lo
+            stats['v' + suffix] = buffer.volume(lo, hi)
+            stats['o' + suffix] = buffer.rate(lo) if hi > lo else None
+            stats['c' + suffix] = buffer.rate(hi - 1) if hi > lo else None
+        return stats
 
 
 class Decision:
 
+    BUY = 1
+    SELL = -1
+
     def __init__(self, timestamp, rate):
         self.timestamp = timestamp
         self.rate = rate
@@ -108,6 +202,13 @@ class BaseStrategy(metaclass=StrategyMeta):
     def decide(self, decision):
         return decision
 
+    def decide_vectorized(self, timestamps, order_types, quantities, rates):
+        """
+        Optional fast path for backtests: `do` for every trade as an int8 array
+        (0 for no decision). None if the strategy can only decide trade by trade.
+        """
+        return None
+
     def add_trade(self, timestamp, order_type, quantity, rate):
         self._trades.add_trade(
             timestamp=timestamp,
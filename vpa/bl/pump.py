@@ -1,4 +1,6 @@
-from .base import BaseStrategy
+import numpy
+
+from .base import BaseStrategy, Decision
 
 
 class PumpBuyStrategy(BaseStrategy):
@@ -8,5 +10,8 @@ class PumpBuyStrategy(BaseStrategy):
     NAME = 'pump'
 
     def decide(self, decision):
-        decision.do = 1
+        decision.do = Decision.BUY
         return decision
+
+    def decide_vectorized(self, timestamps, order_types, quantities, rates):
+        return numpy.full(len(rates), Decision.BUY, dtype=numpy.int8)
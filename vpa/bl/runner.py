@@ -0,0 +1,46 @@
+import time
+
+from .base import StrategyRegistry
+
+
+class StrategiesRunner:
+    """
+    Keeps a strategy instance per market and feeds fills into it.
+    """
+
+    def __init__(self, strategies):
+        self.strategies = []
+        for name in strategies:
+            strategy = StrategyRegistry.get(name)
+            if strategy is None:
+                raise ValueError("Unknown strategy: {}.".format(name))
+            self.strategies.append(strategy)
+        self._instances = {}
+        self.stats = {
+            'trades': 0,
+            'decisions': 0,
+            'time': 0,
+            'max_time': 0
+        }
+
+    def add_trade(self, market, order_type, rate, quantity, timestamp):
+        """
+        Returns decisions rows (decisions with `do` set).
+        """
+        started = time.perf_counter()
+        instances = self._instances.get(market)
+        if instances is None:
+            instances = self._instances[market] = [strategy() for strategy in self.strategies]
+
+        rows = []
+        for strategy in instances:
+            decision = strategy.add_trade(timestamp=timestamp, order_type=order_type, quantity=quantity, rate=rate)
+            if decision is not None and decision.do:
+                rows.append(dict(decision.to_dict(), market=market, strategy=strategy.NAME))
+
+        duration = time.perf_counter() - started
+        self.stats['trades'] += 1
+        self.stats['decisions'] += len(rows)
+        self.stats['time'] += duration
+        self.stats['max_time'] = max(self.stats['max_time'], duration)
+        return rows
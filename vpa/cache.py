@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import sqlalchemy as sa
+from aiohttp import web
+
+from vpa.db.minutes import MinutesTable
+from vpa.db.profile import ProfileTable
+from vpa.db.trades import TradesTable, recent_since
+
+
+def latest_timestamp_query(market, since=None):
+    """
+    since defaults to recent_since(), older markets have no version and are cached until TTL.
+    """
+    return sa.select([sa.func.max(TradesTable.c.timestamp)]).where(
+        sa.and_(
+            TradesTable.c.market == market,
+            TradesTable.c.timestamp >= (recent_since() if since is None else since)
+        )
+    )
+
+
+def latest_minute_query(market):
+    """
+    The minutes aggregator flushes less often than trades are written, its latest row changes on every flush
+    (rollups are written in the same transaction).
+    """
+    return sa.select([
+        MinutesTable.c.timestamp,
+        MinutesTable.c.nsell,
+        MinutesTable.c.nbuy
+    ]).where(MinutesTable.c.market == market).order_by(sa.desc(MinutesTable.c.timestamp)).limit(1)
+
+
+def latest_profile_query(market):
+    """
+    Latest trade (the analysis range is around the last rate) and volume of the latest profile hour.
+    """
+    latest_hour = sa.select([sa.func.max(ProfileTable.c.timestamp)]).where(
+        ProfileTable.c.market == market
+    ).as_scalar()
+    return sa.select([
+        latest_timestamp_query(market=market).as_scalar().label('trade'),
+        sa.select([sa.func.sum(ProfileTable.c.volume)]).where(
+            sa.and_(ProfileTable.c.market == market, ProfileTable.c.timestamp == latest_hour)
+        ).as_scalar().label('volume')
+    ])
+
+
+class ResponseCache:
+    """
+    LRU cache with TTL. Entries are stored with a version (e.g. the latest trade timestamp),
+    an entry with a different version is stale.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'stale': 0,
+            'evictions': 0
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        expires, entry_version, value = entry
+        if time.time() > expires:
+            self.stats['expired'] += 1
+        elif entry_version != version:
+            self.stats['stale'] += 1
+        else:
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+        del self._entries[key]
+        self.stats['misses'] += 1
+        return None
+
+    def set(self, key, version, value):
+        self._entries[key] = (time.time() + self.ttl, version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+
+def cached(handler, version_query=latest_timestamp_query):
+    """
+    Caches 200 responses of a market handler in request.app['cache'] by path and query,
+    a change of the version_query row of the market (new trades by default) invalidates them.
+    version_query should read the tables the handler reads.
+    """
+    @wraps(handler)
+    async def wrapper(request):
+        cache = request.app['cache']
+        key = (request.path, tuple(sorted(request.rel_url.query.items())))
+        async with request.app['pg'].acquire() as conn:
+            result = await conn.execute(version_query(market=request.match_info['market']))
+            row = await result.first()
+            version = tuple(row) if row is not None else None
+
+        cached_response = cache.get(key, version)
+        if cached_response is not None:
+            body, content_type, charset = cached_response
+            return web.Response(body=body, content_type=content_type, charset=charset)
+
+        response = await handler(request)
+        if response.status == 200 and response.body is not None:
+            cache.set(key, version, (response.body, response.content_type, response.charset))
+        return response
+    return wrapper
@@ -3,18 +3,52 @@ from aiopg.sa import create_engine
 from vpa import settings
 
 from .base import metadata
+from .decisions import DecisionsTable
+from .levels import LevelsTable
 from .minutes import MinutesTable
+from .prepared import statements_stats
+from .profile import ProfileTable
 from .trades import TradesTable
 
 
+def pg_dsn(dsn=''):
+    """
+    dsn, or PG_DSN setting, or dsn from PG_* settings.
+    """
+    dsn = dsn or settings.PG_DSN
+    if dsn:
+        return dsn
+    return 'dbname={db} user={user} password={password} host={host}'.format(
+        db=settings.PG_DB,
+        user=settings.PG_USER,
+        password=settings.PG_PASSWORD,
+        host=settings.PG_HOST
+    )
+
+
+async def pg_engine(dsn='', minsize=1, maxsize=10, statement_timeout=0):
+    """
+    statement_timeout is in ms, 0 - no limit.
+    """
+    kwargs = {}
+    if statement_timeout:
+        kwargs['options'] = '-c statement_timeout={}'.format(statement_timeout)
+    return await create_engine(dsn=pg_dsn(dsn), minsize=minsize, maxsize=maxsize, **kwargs)
+
+
+def pg_stats(db_engine):
+    return {
+        'size': db_engine.size,
+        'freesize': db_engine.freesize,
+        'statements': statements_stats()
+    }
+
+
 async def pg_init(app):
-    app['pg'] = await create_engine(
-        dsn='dbname={db} user={user} password={password} host={host}'.format(
-            db=settings.PG_DB,
-            user=settings.PG_USER,
-            password=settings.PG_PASSWORD,
-            host=settings.PG_HOST
-        )
+    app['pg'] = await pg_engine(
+        minsize=settings.PG_POOL_MIN,
+        maxsize=settings.PG_POOL_MAX,
+        statement_timeout=settings.PG_STATEMENT_TIMEOUT
     )
 
 
@@ -0,0 +1,13 @@
+from sqlalchemy.dialects import postgresql
+
+
+async def declare(conn, name, query):
+    """
+    Opens a server side cursor, must be called inside a transaction.
+    """
+    compiled = query.compile(dialect=postgresql.dialect())
+    await conn.execute('DECLARE {} NO SCROLL CURSOR FOR '.format(name) + str(compiled), compiled.params)
+
+
+async def fetch(conn, name, size):
+    return await (await conn.execute('FETCH {} FROM {}'.format(size, name))).fetchall()
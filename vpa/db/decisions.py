@@ -0,0 +1,17 @@
+import sqlalchemy as sa
+
+from .base import metadata
+
+
+DecisionsTable = sa.Table(
+    'decisions',
+    metadata,
+    sa.Column('decision_id', sa.BigInteger, primary_key=True),  # autoincrement
+    sa.Column('market', sa.String(10)),
+    sa.Column('strategy', sa.String(32)),
+    sa.Column('timestamp', sa.DateTime()),
+    sa.Column('rate', sa.Float()),
+    sa.Column('do', sa.SmallInteger()),  # 1 - buy, -1 - sell
+    sa.Column('indicators', sa.JSON()),
+    sa.Index('idx_decisions_market_timestamp', 'market', 'timestamp', unique=False)
+)
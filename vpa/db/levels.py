@@ -0,0 +1,18 @@
+import sqlalchemy as sa
+
+from .base import metadata
+
+
+# latest support/resistance levels per market, replaced by vpa.levels.LevelsEngine
+LevelsTable = sa.Table(
+    'levels',
+    metadata,
+    sa.Column('level_id', sa.BigInteger, primary_key=True),  # autoincrement
+    sa.Column('market', sa.String(10)),
+    sa.Column('timestamp', sa.DateTime()),  # when levels were computed
+    sa.Column('kind', sa.String(10)),  # support or resistance
+    sa.Column('rate', sa.Float()),
+    sa.Column('volume', sa.Float()),
+    sa.Column('share', sa.Float()),  # of the period volume
+    sa.Index('idx_levels_market', 'market', unique=False)
+)
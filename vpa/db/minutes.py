@@ -1,20 +1,42 @@
+import datetime
+
 import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import mapper
 
 from .base import metadata
 
 
-MinutesTable = sa.Table(
-    'minutes',
-    metadata,
-    sa.Column('market', sa.String(10), primary_key=True),
-    sa.Column('timestamp', sa.DateTime(), primary_key=True),
-    sa.Column('vsell', sa.Float()),
-    sa.Column('vbuy', sa.Float()),
-    sa.Column('nsell', sa.Integer()),
-    sa.Column('nbuy', sa.Integer()),
-    sa.Column('ratesell', sa.Float(), nullable=True),  # last sell/buy rates
-    sa.Column('ratebuy', sa.Float(), nullable=True)
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def minutes_table(name):
+    return sa.Table(
+        name,
+        metadata,
+        sa.Column('market', sa.String(10), primary_key=True),
+        sa.Column('timestamp', sa.DateTime(), primary_key=True),
+        sa.Column('vsell', sa.Float()),
+        sa.Column('vbuy', sa.Float()),
+        sa.Column('nsell', sa.Integer()),
+        sa.Column('nbuy', sa.Integer()),
+        sa.Column('ratesell', sa.Float(), nullable=True),  # last sell/buy rates
+        sa.Column('ratebuy', sa.Float(), nullable=True)
+    )
+
+
+MinutesTable = minutes_table('minutes')
+
+# rollups of minutes, maintained by vpa.aggregator
+Minutes5Table = minutes_table('minutes_5m')
+HoursTable = minutes_table('minutes_1h')
+DaysTable = minutes_table('minutes_1d')
+
+RESOLUTIONS = (
+    (60, MinutesTable),
+    (300, Minutes5Table),
+    (3600, HoursTable),
+    (86400, DaysTable)
 )
 
 
@@ -29,3 +51,29 @@ class MinuteMapper:
 
 
 mapper(MinuteMapper, MinutesTable)
+
+
+def upsert(table, rows):
+    """
+    Adds volumes and counts to existing rows, keeps last non-null rates.
+    """
+    stmt = insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.market, table.c.timestamp],
+        set_={
+            'vsell': table.c.vsell + stmt.excluded.vsell,
+            'vbuy': table.c.vbuy + stmt.excluded.vbuy,
+            'nsell': table.c.nsell + stmt.excluded.nsell,
+            'nbuy': table.c.nbuy + stmt.excluded.nbuy,
+            'ratesell': sa.func.coalesce(stmt.excluded.ratesell, table.c.ratesell),
+            'ratebuy': sa.func.coalesce(stmt.excluded.ratebuy, table.c.ratebuy)
+        }
+    )
+
+
+def truncate(timestamp, resolution):
+    """
+    Start of the `resolution` seconds long bucket the timestamp belongs to.
+    """
+    seconds = int((timestamp - EPOCH).total_seconds())
+    return EPOCH + datetime.timedelta(seconds=seconds - seconds % resolution)
@@ -0,0 +1,114 @@
+import datetime
+import logging
+
+import sqlalchemy as sa
+
+from .trades import TradesTable
+
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = TradesTable.name + '_'
+PARTITION_DATE_FORMAT = '%Y%m%d'
+# rows without a daily partition (late fills, clock skew) go here instead of failing the whole INSERT
+DEFAULT_PARTITION = PARTITION_PREFIX + 'default'
+
+
+def partition_name(day):
+    return PARTITION_PREFIX + day.strftime(PARTITION_DATE_FORMAT)
+
+
+def partition_ddl(day):
+    return "CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} FOR VALUES FROM ('{start}') TO ('{stop}')".format(
+        name=partition_name(day),
+        parent=TradesTable.name,
+        start=day.isoformat(),
+        stop=(day + datetime.timedelta(days=1)).isoformat()
+    )
+
+
+def default_partition_ddl():
+    return "CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} DEFAULT".format(
+        name=DEFAULT_PARTITION,
+        parent=TradesTable.name
+    )
+
+
+async def list_partitions(conn):
+    """
+    Returns {day: partition name} for existing trades partitions.
+    """
+    partitions = {}
+    async for row in conn.execute(sa.text(
+            "SELECT c.relname AS name FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+    ).bindparams(parent=TradesTable.name)):
+        try:
+            day = datetime.datetime.strptime(row.name[len(PARTITION_PREFIX):], PARTITION_DATE_FORMAT).date()
+        except ValueError:
+            continue
+        partitions[day] = row.name
+    return partitions
+
+
+def create_partition_statements(day):
+    """
+    (sql, params) pairs to run in one transaction.
+    Postgres refuses to attach a partition while the default one holds rows of its range,
+    such rows are moved to the new partition.
+    """
+    start = datetime.datetime.combine(day, datetime.time())
+    stop = start + datetime.timedelta(days=1)
+    return [
+        ('CREATE TEMPORARY TABLE trades_moved (LIKE {})'.format(TradesTable.name), ()),
+        (
+            'WITH moved AS (DELETE FROM {default} WHERE timestamp >= %s AND timestamp < %s RETURNING *) '
+            'INSERT INTO trades_moved SELECT * FROM moved'.format(default=DEFAULT_PARTITION),
+            (start, stop)
+        ),
+        (partition_ddl(day), ()),
+        ('INSERT INTO {} SELECT * FROM trades_moved'.format(TradesTable.name), ()),
+        ('DROP TABLE trades_moved', ())
+    ]
+
+
+async def create_partition(conn, day):
+    async with conn.begin():
+        for sql, params in create_partition_statements(day):
+            await conn.execute(sql, params)
+
+
+async def create_partitions(conn, days):
+    """
+    Creates the default partition if it is missing and daily partitions from yesterday to today + `days`.
+    """
+    today = datetime.datetime.utcnow().date()
+    await conn.execute(default_partition_ddl())
+    existing = await list_partitions(conn)
+    for i in range(-1, days + 1):
+        day = today + datetime.timedelta(days=i)
+        if day in existing:
+            continue
+        await create_partition(conn=conn, day=day)
+        logger.info("Partition {} created.".format(partition_name(day)))
+
+
+async def drop_partitions(conn, keep_days):
+    """
+    Drops partitions that only hold trades older than `keep_days` days
+    and deletes such trades from the default partition.
+    """
+    oldest = datetime.datetime.utcnow().date() - datetime.timedelta(days=keep_days)
+    await conn.execute(
+        'DELETE FROM {} WHERE timestamp < %s'.format(DEFAULT_PARTITION),
+        (datetime.datetime.combine(oldest, datetime.time()),)
+    )
+    dropped = []
+    for day, name in sorted((await list_partitions(conn)).items()):
+        if day >= oldest:
+            continue
+        await conn.execute('DROP TABLE {}'.format(name))
+        logger.info("Partition {} dropped.".format(name))
+        dropped.append(name)
+    return dropped
@@ -0,0 +1,84 @@
+import re
+import time
+import weakref
+
+from sqlalchemy.dialects import postgresql
+
+from vpa import settings
+
+
+PARAM = re.compile(r'%\((\w+)\)s')
+
+STATEMENTS = {}  # name: PreparedStatement
+
+
+class PreparedStatement:
+    """
+    SQLAlchemy expression compiled once and executed with PREPARE/EXECUTE,
+    so postgres parses and plans it once per connection.
+    Expression parameters are sa.bindparam('name'), values are passed to execute() as keywords.
+    With PG_PREPARED off (e.g. behind pgbouncer in transaction pooling mode) the query is executed as is.
+    """
+
+    def __init__(self, name, query):
+        started = time.perf_counter()
+        compiled = query.compile(dialect=postgresql.dialect()) if not isinstance(query, str) else query
+        self.name = name
+        self.query = query
+        self.params = []
+        # literal % stay escaped, psycopg2 formats statements executed with (even empty) params
+        self.sql = PARAM.sub(self._placeholder, str(compiled))
+        self._execute_sql = 'EXECUTE {}'.format(name)
+        if self.params:
+            self._execute_sql += ' (' + ', '.join(['%s'] * len(self.params)) + ')'
+        self._prepared = weakref.WeakKeyDictionary()  # connection: True
+        self.stats = {
+            'compile_time': time.perf_counter() - started,
+            'prepares': 0,
+            'prepare_time': 0,
+            'executions': 0,
+            'execute_time': 0
+        }
+        STATEMENTS[name] = self
+
+    def _placeholder(self, match):
+        name = match.group(1)
+        if name not in self.params:
+            self.params.append(name)
+        return '${}'.format(self.params.index(name) + 1)
+
+    async def prepare(self, conn):
+        raw = conn.connection
+        if raw in self._prepared:
+            return
+        started = time.perf_counter()
+        await conn.execute('PREPARE {} AS {}'.format(self.name, self.sql))
+        self._prepared[raw] = True
+        self.stats['prepares'] += 1
+        self.stats['prepare_time'] += time.perf_counter() - started
+
+    async def execute(self, conn, **params):
+        """
+        Returns ResultProxy, rows have the same keys as rows of the expression.
+        """
+        if settings.PG_PREPARED:
+            await self.prepare(conn)
+        started = time.perf_counter()
+        if settings.PG_PREPARED:
+            # in a list, so that aiopg does not take a list value (e.g. for unnest) as executemany
+            result = await conn.execute(self._execute_sql, [tuple(params[name] for name in self.params)])
+        else:
+            result = await conn.execute(self.query, [params])
+        self.stats['executions'] += 1
+        self.stats['execute_time'] += time.perf_counter() - started
+        return result
+
+
+def statements_stats():
+    return {
+        name: dict(
+            statement.stats,
+            avg_execute_time=statement.stats['execute_time'] / statement.stats['executions']
+            if statement.stats['executions'] else 0
+        ) for name, statement in STATEMENTS.items()
+    }
@@ -0,0 +1,51 @@
+import math
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+
+from .base import metadata
+
+
+# changing these requires rebuilding the table, see the volume_profile migration
+BIN_STEP = 0.001  # a bin is 0.1% wide
+RESOLUTION = 3600  # seconds per time bucket
+
+LOG_STEP = math.log1p(BIN_STEP)
+
+# volume per market, hour, order type and log-scaled price bin, maintained by vpa.aggregator
+ProfileTable = sa.Table(
+    'volume_profile',
+    metadata,
+    sa.Column('market', sa.String(10), primary_key=True),
+    sa.Column('timestamp', sa.DateTime(), primary_key=True),
+    sa.Column('order_type', sa.String(4), primary_key=True),
+    sa.Column('bin', sa.Integer(), primary_key=True),
+    sa.Column('volume', sa.Float())
+)
+
+
+def rate_bin(rate):
+    """
+    Bin n holds rates from (1 + BIN_STEP) ** n to (1 + BIN_STEP) ** (n + 1).
+    """
+    return int(math.floor(math.log(rate) / LOG_STEP))
+
+
+def bin_rate(n):
+    """
+    Middle of the bin (geometric).
+    """
+    return math.exp((n + 0.5) * LOG_STEP)
+
+
+def upsert(rows):
+    stmt = insert(ProfileTable).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            ProfileTable.c.market,
+            ProfileTable.c.timestamp,
+            ProfileTable.c.order_type,
+            ProfileTable.c.bin
+        ],
+        set_={'volume': ProfileTable.c.volume + stmt.excluded.volume}
+    )
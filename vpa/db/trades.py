@@ -1,19 +1,26 @@
+import datetime
+
 import sqlalchemy as sa
 from sqlalchemy.orm import mapper
 
+from vpa import settings
+
 from .base import metadata
 
 
+# partitioned by range of timestamp, a partition per day, see vpa.db.partitions
 TradesTable = sa.Table(
     'trades',
     metadata,
-    sa.Column('trade_id', sa.Integer, primary_key=True),  # autoincrement
+    sa.Column('trade_id', sa.BigInteger, primary_key=True, autoincrement=True),
     sa.Column('market', sa.String(10)),
     sa.Column('order_type', sa.String(4)),
     sa.Column('rate', sa.Float()),
     sa.Column('quantity', sa.Float()),
-    sa.Column('timestamp', sa.DateTime()),
-    sa.Index('idx_timestamp', 'timestamp', unique=False)
+    sa.Column('timestamp', sa.DateTime(), primary_key=True),
+    sa.Index('idx_timestamp', 'timestamp', unique=False),
+    # trailing columns make handler queries index-only
+    sa.Index('idx_trades_market_timestamp', 'market', 'timestamp', 'order_type', 'rate', 'quantity', unique=False)
 )
 
 
@@ -21,6 +28,7 @@ class TradeMapper:
 
     ORDER_TYPE_SELL = 'SELL'
     ORDER_TYPE_BUY = 'BUY'
+    ORDER_TYPES = (ORDER_TYPE_BUY, ORDER_TYPE_SELL)  # position is used as numeric code
 
     def __init__(self, trade_id, market, order_type, rate, quantity, timestamp):
         self.trade_id = trade_id
@@ -32,3 +40,11 @@ class TradeMapper:
 
 
 mapper(TradeMapper, TradesTable)
+
+
+def recent_since():
+    """
+    Lower timestamp bound for "latest trades of a market" queries, so they are pruned
+    to the last LATEST_TRADES_DAYS partitions instead of an index descent per partition.
+    """
+    return datetime.datetime.utcnow() - datetime.timedelta(days=settings.LATEST_TRADES_DAYS)
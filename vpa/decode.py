@@ -0,0 +1,58 @@
+import datetime
+import json
+from collections import namedtuple
+
+import dateutil.parser
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+        loads = ujson.loads
+    except ImportError:
+        loads = json.loads
+
+
+Fill = namedtuple('Fill', ('market', 'order_type', 'rate', 'quantity', 'timestamp'))
+
+
+def parse_timestamp(value):
+    """
+    Bittrex TimeStamp, e.g. 2018-03-17T14:43:04.257 (fraction is optional).
+    """
+    try:
+        if len(value) == 19:
+            microsecond = 0
+        elif 20 < len(value) <= 27 and value[19] == '.':
+            microsecond = int(value[20:26].ljust(6, '0'))
+        else:
+            raise ValueError(value)
+        return datetime.datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19]),
+            microsecond
+        )
+    except ValueError:
+        return dateutil.parser.parse(value)
+
+
+def decode_frame(data):
+    """
+    Returns [(market, [Fill, ...]), ...] for updateExchangeState blocks of a socket frame.
+    """
+    data = loads(data)
+    result = []
+    for block in data.get('M', ()):
+        if block['M'] != 'updateExchangeState':
+            continue
+        for change in block['A']:
+            fills = change['Fills']
+            if fills:
+                market = change['MarketName']
+                result.append((market, [
+                    Fill(market, fill['OrderType'], fill['Rate'], fill['Quantity'], parse_timestamp(fill['TimeStamp']))
+                    for fill in fills
+                ]))
+    return result
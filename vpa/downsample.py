@@ -0,0 +1,46 @@
+import numpy
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets, returns indices of `threshold` points that keep the shape of (x, y).
+    x must be sorted. Averages of all buckets are computed at once, the loop only picks a point per bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return numpy.arange(n)
+
+    # bucket i is edges[i]:edges[i + 1], the last one holds only the last point
+    every = (n - 2) / (threshold - 2)
+    edges = numpy.append((numpy.arange(threshold - 1) * every).astype(numpy.int64) + 1, n)
+    counts = numpy.diff(edges)
+    cx = numpy.concatenate(([0], numpy.cumsum(x)))
+    cy = numpy.concatenate(([0], numpy.cumsum(y)))
+    avg_x = (cx[edges[1:]] - cx[edges[:-1]]) / counts
+    avg_y = (cy[edges[1:]] - cy[edges[:-1]]) / counts
+
+    indices = numpy.empty(threshold, dtype=numpy.int64)
+    indices[0] = a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        areas = numpy.abs(
+            (x[a] - avg_x[i + 1]) * (y[start:stop] - y[a]) -
+            (x[a] - x[start:stop]) * (avg_y[i + 1] - y[a])
+        )
+        indices[i + 1] = a = start + int(areas.argmax())
+    indices[-1] = n - 1
+    return indices
+
+
+def downsample(points, max_points, key='y'):
+    """
+    Chart.js points ({'x': iso timestamp, 'y': value, ...}) sorted by x, reduced to max_points.
+    Points without a value are dropped.
+    """
+    points = [p for p in points if p[key] is not None]
+    if not max_points or len(points) <= max_points:
+        return points
+    x = numpy.array([p['x'] for p in points], dtype='datetime64[us]').astype(numpy.int64)
+    x = (x - x[0]) / 10 ** 6
+    y = numpy.array([p[key] for p in points], dtype=numpy.float64)
+    return [points[i] for i in lttb(x, y, max_points)]
@@ -0,0 +1,94 @@
+import datetime
+
+from sqlalchemy.dialects import postgresql
+
+from vpa.cache import latest_minute_query, latest_profile_query, latest_timestamp_query
+from vpa.db import pg_engine
+from vpa.db.trades import recent_since
+from vpa.handlers.analysis import last_rate_query, profile_query
+from vpa.handlers.export import export_query
+from vpa.handlers.market import latest_trades_query
+from vpa.handlers.minutes import minutes_query
+from vpa.levels import levels_profile_query, market_levels_query
+
+
+# trades partitions get their own copies of the index
+TRADES_INDEX = 'market_timestamp'
+MINUTES_INDEX = 'minutes_pkey'
+PROFILE_INDEX = 'volume_profile_pkey'
+LEVELS_INDEX = 'idx_levels_market'
+
+
+def handler_queries(market):
+    now = datetime.datetime.utcnow()
+    return (
+        ('cache probe', latest_timestamp_query(market=market), TRADES_INDEX),
+        ('cache probe (minutes)', latest_minute_query(market=market), MINUTES_INDEX),
+        ('cache probe (profile)', latest_profile_query(market=market), PROFILE_INDEX),
+        ('market_handler', latest_trades_query(market=market, limit=200, since=recent_since()), TRADES_INDEX),
+        ('bubbles_handler', latest_trades_query(market=market, limit=400, since=recent_since()), TRADES_INDEX),
+        ('export_handler', export_query(
+            market=market,
+            start=now - datetime.timedelta(hours=2),
+            stop=now + datetime.timedelta(hours=1)
+        ), TRADES_INDEX),
+        ('analysis_handler (last rate)', last_rate_query(market=market), TRADES_INDEX),
+        ('analysis_handler (profile)', profile_query(
+            market=market,
+            since=now - datetime.timedelta(hours=168),
+            from_bin=-1000,
+            to_bin=0
+        ), PROFILE_INDEX),
+        ('levels_handler', market_levels_query(market=market), LEVELS_INDEX),
+        ('levels engine (profile)', levels_profile_query(
+            market=market,
+            since=now - datetime.timedelta(hours=168),
+            from_bin=-1000,
+            to_bin=0
+        ), PROFILE_INDEX),
+        ('minutes_handler', minutes_query(
+            market=market,
+            start=now - datetime.timedelta(hours=2),
+            stop=now + datetime.timedelta(hours=1)
+        ), MINUTES_INDEX)
+    )
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+async def explain(conn, query):
+    compiled = query.compile(dialect=postgresql.dialect())
+    result = await conn.scalar('EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params)
+    return result[0]['Plan']
+
+
+async def main(market):
+    """
+    Checks that handler queries are planned as scans of the expected indexes.
+    Index Scan instead of Index Only Scan means the table needs VACUUM.
+    """
+    ok = True
+    db_engine = await pg_engine()
+    try:
+        async with db_engine.acquire() as conn:
+            for name, query, index in handler_queries(market=market):
+                nodes = list(plan_nodes(await explain(conn=conn, query=query)))
+                used = any(index in node.get('Index Name', '') for node in nodes)
+                ok = ok and used
+                print("{status} {name}: {nodes}".format(
+                    status='OK  ' if used else 'FAIL',
+                    name=name,
+                    nodes=', '.join(
+                        '{} ({})'.format(node['Node Type'], node['Index Name'])
+                        if 'Index Name' in node else node['Node Type']
+                        for node in nodes
+                    )
+                ))
+    finally:
+        db_engine.close()
+        await db_engine.wait_closed()
+    return ok
@@ -0,0 +1,70 @@
+import numpy
+
+
+def rolling_sum(values, window):
+    """
+    Sum of the last `window` values for each position, shorter windows at the beginning.
+    """
+    cumulative = numpy.concatenate(([0], numpy.cumsum(values)))
+    stop = numpy.arange(1, len(values) + 1)
+    return cumulative[stop] - cumulative[numpy.maximum(stop - window, 0)]
+
+
+def ratio(numerator, denominator, empty):
+    """
+    numerator / denominator, `empty` where the denominator is 0.
+    """
+    result = numpy.full(len(numerator), empty, dtype=numpy.float64)
+    numpy.divide(numerator, denominator, out=result, where=denominator != 0)
+    return result
+
+
+def forward_fill(values):
+    """
+    Replaces NaN with the previous value, leading NaN stay.
+    """
+    positions = numpy.where(numpy.isnan(values), 0, numpy.arange(len(values)))
+    numpy.maximum.accumulate(positions, out=positions)
+    return values[positions]
+
+
+def close_rates(ratesell, ratebuy):
+    """
+    Minutes store last sell and buy rates, their mean is used as close, minutes without trades keep the previous one.
+    """
+    rates = numpy.vstack((ratesell, ratebuy))
+    counts = (~numpy.isnan(rates)).sum(axis=0)
+    return forward_fill(ratio(numpy.nansum(rates, axis=0), counts, empty=numpy.nan))
+
+
+def money_flow(vsell, vbuy, ratesell, ratebuy, window):
+    """
+    Indicators over minutes (or rollup) rows, arguments are float arrays, missing rates are NaN.
+    cvd - cumulative buy - sell volume delta,
+    obv - on balance volume, volume is added when close goes up and subtracted when it goes down,
+    vwap - volume weighted close over `window` rows,
+    cmf - Chaikin money flow over `window` rows. Minutes have no high/low,
+    so the money flow multiplier is (buy - sell) / (buy + sell).
+    Windows without volume have vwap NaN and cmf 0.
+    """
+    volume = vsell + vbuy
+    delta = vbuy - vsell
+    close = close_rates(ratesell, ratebuy)
+
+    direction = numpy.sign(numpy.concatenate(([numpy.nan], numpy.diff(close))))
+    obv = numpy.cumsum(numpy.where(numpy.isnan(direction), 0, direction) * volume)
+
+    priced = ~numpy.isnan(close)
+    vwap = ratio(
+        rolling_sum(numpy.where(priced, close * volume, 0), window),
+        rolling_sum(numpy.where(priced, volume, 0), window),
+        empty=numpy.nan
+    )
+    cmf = ratio(rolling_sum(delta, window), rolling_sum(volume, window), empty=0)
+
+    return {
+        'cvd': numpy.cumsum(delta),
+        'obv': obv,
+        'vwap': vwap,
+        'cmf': cmf
+    }
@@ -2,77 +2,120 @@ import datetime
 
 import sqlalchemy as sa
 import aiohttp_jinja2
+from aiohttp import web
 from sqlalchemy.sql import func
 
-from vpa.db.trades import TradesTable
+from vpa.db.minutes import truncate
+from vpa.db.prepared import PreparedStatement
+from vpa.db.profile import BIN_STEP, RESOLUTION, ProfileTable, bin_rate, rate_bin
+from vpa.db.trades import TradeMapper, TradesTable, recent_since
 
 
-async def vpa(conn, market, period, order_type):
-    last_trade = await (
-        await conn.execute(
-            TradesTable.select().where(
-                sa.and_(
-                    TradesTable.c.market == market,
-                    TradesTable.c.order_type == order_type
-                )
-            ).order_by(
-                sa.desc(TradesTable.c.timestamp)
-            )
+def last_rate_query(market, since=None):
+    """
+    since defaults to recent_since().
+    """
+    return sa.select([TradesTable.c.rate]).where(
+        sa.and_(
+            TradesTable.c.market == market,
+            TradesTable.c.timestamp >= (recent_since() if since is None else since)
         )
-    ).first()
-
-    from_rate = last_trade.rate * 0.95
-    to_rate = last_trade.rate * 1.05
-
-    result = {}
-    previous_level = 0
-    for i in range(10):
-        level = from_rate + (to_rate - from_rate) / 10 * i
-
-        result[level] = await conn.scalar(
-            sa.select([func.sum(TradesTable.c.quantity)]).where(
-                sa.and_(
-                    TradesTable.c.market == market,
-                    TradesTable.c.timestamp >= (
-                            datetime.datetime.utcnow() - datetime.timedelta(hours=period)
-                    ),
-                    TradesTable.c.rate > previous_level,
-                    TradesTable.c.rate <= level,
-                    TradesTable.c.order_type == order_type
-                )
-            )
+    ).order_by(
+        sa.desc(TradesTable.c.timestamp)
+    ).limit(1)
+
+
+def profile_query(market, since, from_bin, to_bin):
+    n = func.least(func.greatest(ProfileTable.c.bin, from_bin), to_bin).label('bin')
+    return sa.select([
+        ProfileTable.c.order_type,
+        n,
+        func.sum(ProfileTable.c.volume).label('volume')
+    ]).where(
+        sa.and_(
+            ProfileTable.c.market == market,
+            ProfileTable.c.timestamp >= since
         )
-        previous_level = level
-
-    result[previous_level] = await conn.scalar(
-        sa.select([func.sum(TradesTable.c.quantity)]).where(
-            sa.and_(
-                TradesTable.c.market == market,
-                TradesTable.c.timestamp >= (
-                        datetime.datetime.utcnow() - datetime.timedelta(hours=period)
-                ),
-                TradesTable.c.rate > previous_level,
-                TradesTable.c.order_type == order_type
-            )
-        )
-    )
+    ).group_by(ProfileTable.c.order_type, n)
+
+
+profile_statement = PreparedStatement('volume_profile', profile_query(
+    market=sa.bindparam('market'),
+    since=sa.bindparam('since'),
+    from_bin=sa.bindparam('from_bin'),
+    to_bin=sa.bindparam('to_bin')
+))
+
+
+async def vpa(conn, market, period, levels=10, spread=5):
+    """
+    Volume at price per order type since the start of the hour `period` hours ago,
+    profile rows are hourly, so period=1 covers from 1 to 2 hours including the current one.
+    Rates within +-`spread` percents around the last rate are split into `levels` buckets,
+    rates outside the range are counted in the edge buckets.
+    Sums precomputed volume_profile cells, a bin goes to the bucket its middle rate is in,
+    so a bucket must be at least a bin (BIN_STEP) wide, see max_levels().
+    """
+    result = {
+        TradeMapper.ORDER_TYPE_BUY: {},
+        TradeMapper.ORDER_TYPE_SELL: {}
+    }
+
+    last_rate = await conn.scalar(last_rate_query(market=market))
+    if last_rate is None:
+        return result
+
+    from_rate = last_rate * (1 - spread / 100)
+    to_rate = last_rate * (1 + spread / 100)
+    step = (to_rate - from_rate) / levels
+
+    for order_type in result:
+        for i in range(levels):
+            result[order_type][from_rate + step * (i + 0.5)] = 0
+
+    async for row in await profile_statement.execute(
+            conn,
+            market=market,
+            since=truncate(datetime.datetime.utcnow() - datetime.timedelta(hours=period), RESOLUTION),
+            from_bin=rate_bin(from_rate),
+            to_bin=rate_bin(to_rate)):
+        if row.order_type in result:
+            level = min(max(int((bin_rate(row.bin) - from_rate) / step), 0), levels - 1)
+            result[row.order_type][from_rate + step * (level + 0.5)] += row.volume or 0
 
     return result
 
 
+def max_levels(spread):
+    """
+    Most buckets for +-`spread` percents that are not narrower than a volume_profile bin.
+    """
+    return int(round(2 * spread / (BIN_STEP * 100), 6))  # rounded, 0.6 / 0.1 is 5.999...
+
+
 async def analysis_handler(request):
     market = request.match_info.get('market')
     period_hrs = int(request.rel_url.query.get('period', 1))  # hrs
+    levels = int(request.rel_url.query.get('levels', 10))
+    spread = float(request.rel_url.query.get('spread', 5))  # %
+
+    if not 0 < levels <= 1000:
+        raise web.HTTPBadRequest(text="levels must be between 1 and 1000.")
+    if not 0 < spread < 100:
+        raise web.HTTPBadRequest(text="spread must be between 0 and 100.")
+    if levels > max_levels(spread):
+        raise web.HTTPBadRequest(text="levels must be at most {} for spread {}, price bins are {}% wide.".format(
+            max_levels(spread), spread, BIN_STEP * 100
+        ))
 
     async with request.app['pg'].acquire() as conn:
-        buy_result = await vpa(conn=conn, market=market, period=period_hrs, order_type='BUY')
-        sell_result = await vpa(conn=conn, market=market, period=period_hrs, order_type='SELL')
+        result = await vpa(conn=conn, market=market, period=period_hrs, levels=levels, spread=spread)
 
     points = []
-    for price, volume in buy_result.items():
+    for price, volume in result[TradeMapper.ORDER_TYPE_BUY].items():
         points.append({'x': price, 'y': volume or 0, 'c': 'rgba(255, 99, 132, 0.2)'})
 
-    for price, volume in sell_result.items():
+    for price, volume in result[TradeMapper.ORDER_TYPE_SELL].items():
         points.append({'x': price, 'y': volume or 0, 'c': 'rgba(75, 192, 192, 0.2)'})
 
     points = sorted(points, key=lambda i: i['x'])
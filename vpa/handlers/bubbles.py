@@ -1,27 +1,34 @@
 import json
 
 import aiohttp_jinja2
-import sqlalchemy as sa
 
-from vpa.db.trades import TradesTable
+from vpa.db.trades import recent_since
+from vpa.downsample import downsample
+
+from .market import latest_trades_statement
+from .minutes import parse_max_points, parse_trades
 
 
 async def bubbles_handler(request):
     market = request.match_info.get('market')
+    max_points = parse_max_points(query=request.rel_url.query)
+    limit = parse_trades(query=request.rel_url.query, default=400)
 
     points_buy = []
     points_sell = []
 
     async with request.app['pg'].acquire() as conn:
-        async for row in conn.execute(
-                TradesTable.select().where(
-                    TradesTable.c.market == market
-                ).order_by(sa.desc(TradesTable.c.timestamp)).limit(400)):
+        async for row in await latest_trades_statement.execute(
+                conn, market=market, limit=limit, since=recent_since()):
             if row.order_type == 'BUY':
                 points_buy.append({'x': row.timestamp.isoformat(), 'r': row.quantity * 5, 'y': row.rate})
             elif row.order_type == 'SELL':
                 points_sell.append({'x': row.timestamp.isoformat(), 'r': row.quantity, 'y': row.rate})
 
+    # rows are newest first, points are picked by rate
+    points_buy = downsample(points_buy[::-1], max_points)
+    points_sell = downsample(points_sell[::-1], max_points)
+
     max_volume = max(
         max([i['r'] for i in points_buy]),
         max([i['r'] for i in points_sell])
@@ -1,26 +1,182 @@
+import csv
+import io
+import json
+
+import numpy
 import sqlalchemy as sa
 from aiohttp import web
 
-from vpa.db.trades import TradesTable
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from vpa import settings
+from vpa.db.cursors import declare, fetch
+from vpa.db.trades import TradeMapper, TradesTable
 
 from .minutes import parse_period
 
 
+class NDJSONEncoder:
+
+    content_type = 'application/x-ndjson'
+
+    def header(self):
+        return b''
+
+    def encode(self, rows):
+        return ''.join(json.dumps({
+            'market': row.market,
+            'order_type': row.order_type,
+            'rate': row.rate,
+            'quantity': row.quantity,
+            'timestamp': row.timestamp.isoformat()
+        }) + '\n' for row in rows).encode()
+
+    def footer(self):
+        return b''
+
+
+class CSVEncoder:
+
+    content_type = 'text/csv'
+
+    def header(self):
+        return b'market,order_type,rate,quantity,timestamp\r\n'
+
+    def encode(self, rows):
+        output = io.StringIO()
+        writer = csv.writer(output)
+        for row in rows:
+            writer.writerow((row.market, row.order_type, row.rate, row.quantity, row.timestamp.isoformat()))
+        return output.getvalue().encode()
+
+    def footer(self):
+        return b''
+
+
+class ArrowEncoder:
+    """
+    Arrow IPC stream, a record batch per fetched chunk.
+    order_type is uint8: 0 - buy, 1 - sell.
+    """
+
+    content_type = 'application/vnd.apache.arrow.stream'
+
+    def __init__(self):
+        self._schema = pyarrow.schema([
+            pyarrow.field('market', pyarrow.string()),
+            pyarrow.field('order_type', pyarrow.uint8()),
+            pyarrow.field('rate', pyarrow.float64()),
+            pyarrow.field('quantity', pyarrow.float64()),
+            pyarrow.field('timestamp', pyarrow.timestamp('us'))  # int64 since epoch
+        ])
+        self._order_types = {order_type: i for i, order_type in enumerate(TradeMapper.ORDER_TYPES)}
+        self._buffer = io.BytesIO()
+        self._writer = None
+
+    def _pop(self):
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def header(self):
+        self._writer = pyarrow.RecordBatchStreamWriter(self._buffer, self._schema)
+        return self._pop()
+
+    def encode(self, rows):
+        self._writer.write_batch(pyarrow.RecordBatch.from_arrays([
+            pyarrow.array([row.market for row in rows], type=pyarrow.string()),
+            pyarrow.array(numpy.fromiter(
+                (self._order_types.get(row.order_type, 255) for row in rows), dtype=numpy.uint8, count=len(rows)
+            )),
+            pyarrow.array(numpy.fromiter((row.rate for row in rows), dtype=numpy.float64, count=len(rows))),
+            pyarrow.array(numpy.fromiter((row.quantity for row in rows), dtype=numpy.float64, count=len(rows))),
+            pyarrow.array(numpy.array([row.timestamp for row in rows], dtype='datetime64[us]'))
+        ], schema=self._schema))
+        return self._pop()
+
+    def footer(self):
+        self._writer.close()
+        return self._pop()
+
+
+ENCODERS = {
+    'ndjson': NDJSONEncoder,
+    'csv': CSVEncoder
+}
+
+if pyarrow is not None:
+    ENCODERS['arrow'] = ArrowEncoder
+
+
+def export_query(market, start, stop):
+    """
+    All markets if market is None.
+    """
+    conditions = [
+        TradesTable.c.timestamp >= start,
+        TradesTable.c.timestamp < stop
+    ]
+    if market:
+        conditions.append(TradesTable.c.market == market)
+    return sa.select([
+        TradesTable.c.market,
+        TradesTable.c.order_type,
+        TradesTable.c.rate,
+        TradesTable.c.quantity,
+        TradesTable.c.timestamp
+    ]).where(sa.and_(*conditions)).order_by(TradesTable.c.timestamp)
+
+
+async def stream_export(request, query, encoder):
+    """
+    Sends rows as they are fetched from a server side cursor.
+    """
+    response = web.StreamResponse()
+    response.content_type = encoder.content_type
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+    header = encoder.header()
+    if header:
+        await response.write(header)
+
+    async with request.app['pg'].acquire() as conn:
+        async with conn.begin():
+            await declare(conn=conn, name='export_cursor', query=query)
+            while True:
+                rows = await fetch(conn=conn, name='export_cursor', size=settings.EXPORT_CHUNK_SIZE)
+                if not rows:
+                    break
+                await response.write(encoder.encode(rows))
+
+    footer = encoder.footer()
+    if footer:
+        await response.write(footer)
+    await response.write_eof()
+    return response
+
+
 async def export_handler(request):
     market = request.match_info.get('market')
     start, stop = parse_period(query=request.rel_url.query)
+    query = export_query(market=market, start=start, stop=stop)
+
+    export_format = request.rel_url.query.get('format', 'json')
+    if export_format in ENCODERS:
+        return await stream_export(request=request, query=query, encoder=ENCODERS[export_format]())
+    elif export_format == 'arrow':
+        raise web.HTTPBadRequest(text="arrow format requires pyarrow to be installed.")
+    elif export_format != 'json':
+        raise web.HTTPBadRequest(text="format must be one of: json, {}.".format(', '.join(sorted(ENCODERS))))
 
     trades = []
     async with request.app['pg'].acquire() as conn:
-        async for row in conn.execute(
-                TradesTable.select().where(
-                    sa.and_(
-                        TradesTable.c.market == market,
-                        TradesTable.c.timestamp >= start,
-                        TradesTable.c.timestamp < stop
-                    )
-                ).order_by(TradesTable.c.timestamp)):
+        async for row in conn.execute(query):
             trades.append({
+                'market': row.market,
                 'order_type': row.order_type,
                 'rate': row.rate,
                 'quantity': row.quantity,
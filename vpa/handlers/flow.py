@@ -0,0 +1,50 @@
+import numpy
+from aiohttp import web
+
+from vpa.flow import money_flow
+
+from .minutes import minutes_statements, parse_period, parse_resolution
+
+
+def to_list(values):
+    """
+    NaN to None, for JSON.
+    """
+    result = values.astype(object)
+    result[numpy.isnan(values)] = None
+    return result.tolist()
+
+
+async def flow_handler(request):
+    market = request.match_info.get('market')
+    start, stop = parse_period(query=request.rel_url.query)
+    table = parse_resolution(query=request.rel_url.query, start=start, stop=stop)
+    window = int(request.rel_url.query.get('window', 20))  # rows
+
+    if not 0 < window <= 10000:
+        raise web.HTTPBadRequest(text="window must be between 1 and 10000.")
+
+    rows = []
+    async with request.app['pg'].acquire() as conn:
+        async for row in await minutes_statements[table].execute(conn, market=market, start=start, stop=stop):
+            rows.append(row)
+
+    columns = numpy.array(
+        [(row.vsell, row.vbuy, row.ratesell, row.ratebuy) for row in rows],
+        dtype=numpy.float64
+    ).reshape(-1, 4)
+    indicators = money_flow(
+        vsell=numpy.nan_to_num(columns[:, 0]),
+        vbuy=numpy.nan_to_num(columns[:, 1]),
+        ratesell=columns[:, 2],
+        ratebuy=columns[:, 3],
+        window=window
+    )
+
+    return web.json_response(dict(
+        {name: to_list(values) for name, values in indicators.items()},
+        market=market,
+        table=table.name,
+        window=window,
+        timestamps=[row.timestamp.isoformat() for row in rows]
+    ))
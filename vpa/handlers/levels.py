@@ -0,0 +1,28 @@
+from aiohttp import web
+
+from vpa.levels import market_levels_query
+
+
+async def levels_handler(request):
+    """
+    Latest levels found by the watcher (vpa.levels.LevelsEngine).
+    """
+    market = request.match_info.get('market')
+
+    timestamp = None
+    levels = []
+    async with request.app['pg'].acquire() as conn:
+        async for row in conn.execute(market_levels_query(market=market)):
+            timestamp = row.timestamp.isoformat()
+            levels.append({
+                'kind': row.kind,
+                'rate': row.rate,
+                'volume': row.volume,
+                'share': row.share
+            })
+
+    return web.json_response({
+        'market': market,
+        'timestamp': timestamp,
+        'levels': levels
+    })
@@ -0,0 +1,19 @@
+from aiohttp import web
+
+
+async def live_handler(request):
+    """
+    Websocket with new fills and minutes of the market, see vpa.live.MarketFeed.
+    """
+    market = request.match_info.get('market')
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+
+    feeds = request.app['live']
+    feeds.subscribe(market, ws)
+    try:
+        async for _ in ws:
+            pass  # clients only listen
+    finally:
+        feeds.unsubscribe(market, ws)
+    return ws
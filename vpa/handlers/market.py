@@ -1,26 +1,58 @@
 import aiohttp_jinja2
 import sqlalchemy as sa
 
-from vpa.db.trades import TradesTable
+from vpa.db.prepared import PreparedStatement
+from vpa.db.trades import TradesTable, recent_since
+from vpa.downsample import downsample
+
+from .minutes import parse_max_points, parse_trades
+
+
+def latest_trades_query(market, limit, since):
+    return sa.select([
+        TradesTable.c.order_type,
+        TradesTable.c.rate,
+        TradesTable.c.quantity,
+        TradesTable.c.timestamp
+    ]).where(
+        sa.and_(
+            TradesTable.c.market == market,
+            TradesTable.c.timestamp >= since
+        )
+    ).order_by(sa.desc(TradesTable.c.timestamp)).limit(limit)
+
+
+latest_trades_statement = PreparedStatement(
+    'latest_trades',
+    latest_trades_query(
+        market=sa.bindparam('market'),
+        limit=sa.bindparam('limit'),
+        since=sa.bindparam('since')
+    )
+)
 
 
 async def market_handler(request):
     market = request.match_info.get('market')
+    max_points = parse_max_points(query=request.rel_url.query)
+    limit = parse_trades(query=request.rel_url.query, default=200)
 
     lines = []
     points_buy = []
     points_sell = []
 
     async with request.app['pg'].acquire() as conn:
-        async for row in conn.execute(
-                TradesTable.select().where(
-                    TradesTable.c.market == market
-                ).order_by(sa.desc(TradesTable.c.timestamp)).limit(200)):
+        async for row in await latest_trades_statement.execute(
+                conn, market=market, limit=limit, since=recent_since()):
             if row.order_type == 'BUY':
                 points_buy.append({'x': row.timestamp.isoformat(), 'y': row.quantity})
             elif row.order_type == 'SELL':
                 points_sell.append({'x': row.timestamp.isoformat(), 'y': row.quantity})
 
+    # rows are newest first
+    points_buy = downsample(points_buy[::-1], max_points)
+    points_sell = downsample(points_sell[::-1], max_points)
+
     lines.append({'label': 'Buy', 'data': points_buy, 'borderColor': '#e6194b'})
     lines.append({'label': 'Sell', 'data': points_sell, 'borderColor': '#3cb44b'})
 
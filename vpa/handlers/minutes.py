@@ -4,8 +4,12 @@ import json
 import aiohttp_jinja2
 import dateutil.parser
 import sqlalchemy as sa
+from aiohttp import web
 
-from vpa.db.minutes import MinutesTable
+from vpa import settings
+from vpa.db.minutes import RESOLUTIONS, MinutesTable
+from vpa.db.prepared import PreparedStatement
+from vpa.downsample import downsample
 from vpa.utils import COLORS
 
 
@@ -32,9 +36,78 @@ def parse_period(query):
     return start, stop
 
 
+def parse_max_points(query):
+    max_points = int(query.get('max_points', settings.MAX_POINTS))
+    if max_points < 3:
+        raise web.HTTPBadRequest(text="max_points must be 3 or more.")
+    return max_points
+
+
+def parse_trades(query, default):
+    """
+    Number of latest trades to show, larger windows are downsampled to max_points.
+    """
+    trades = int(query.get('trades', default))
+    if not 0 < trades <= settings.CHART_TRADES_MAX:
+        raise web.HTTPBadRequest(text="trades must be between 1 and {}.".format(settings.CHART_TRADES_MAX))
+    return trades
+
+
+def pick_resolution(start, stop, min_points):
+    """
+    The coarsest resolution that still gives at least `min_points` points.
+    """
+    seconds = (stop - start).total_seconds()
+    result = RESOLUTIONS[0]
+    for resolution, table in RESOLUTIONS:
+        if seconds / resolution >= min_points:
+            result = (resolution, table)
+    return result
+
+
+def parse_resolution(query, start, stop):
+    """
+    Minutes table for the resolution param, or picked by period length.
+    """
+    resolution = query.get('resolution', '')
+    if resolution:
+        tables = dict(RESOLUTIONS)
+        if int(resolution) not in tables:
+            raise web.HTTPBadRequest(text="resolution must be one of: {}.".format(
+                ', '.join(str(r) for r, _ in RESOLUTIONS)
+            ))
+        return tables[int(resolution)]
+    _, table = pick_resolution(start=start, stop=stop, min_points=settings.MINUTES_MIN_POINTS)
+    return table
+
+
+def minutes_query(market, start, stop, table=MinutesTable):
+    return table.select().where(
+        sa.and_(
+            table.c.market == market,
+            table.c.timestamp >= start,
+            table.c.timestamp < stop
+        )
+    ).order_by(table.c.timestamp)
+
+
+# table: statement, for each resolution
+minutes_statements = {
+    table: PreparedStatement('{}_range'.format(table.name), minutes_query(
+        market=sa.bindparam('market'),
+        start=sa.bindparam('start'),
+        stop=sa.bindparam('stop'),
+        table=table
+    )) for _, table in RESOLUTIONS
+}
+
+
 async def minutes_handler(request):
     market = request.match_info.get('market')
     start, stop = parse_period(query=request.rel_url.query)
+    max_points = parse_max_points(query=request.rel_url.query)
+
+    table = parse_resolution(query=request.rel_url.query, start=start, stop=stop)
 
     vsell = []
     vbuy = []
@@ -42,20 +115,18 @@ async def minutes_handler(request):
     rbuy = []
 
     async with request.app['pg'].acquire() as conn:
-        async for row in conn.execute(
-                MinutesTable.select().where(
-                    sa.and_(
-                        MinutesTable.c.market == market,
-                        MinutesTable.c.timestamp >= start,
-                        MinutesTable.c.timestamp < stop
-                    )
-                ).order_by(MinutesTable.c.timestamp)):
+        async for row in await minutes_statements[table].execute(conn, market=market, start=start, stop=stop):
             x = row.timestamp.isoformat()
             vsell.append({'x': x, 'y': -row.vsell})
             vbuy.append({'x': x, 'y': row.vbuy})
             rsell.append({'x': x, 'y': row.ratesell})
             rbuy.append({'x': x, 'y': row.ratebuy})
 
+    vsell = downsample(vsell, max_points)
+    vbuy = downsample(vbuy, max_points)
+    rsell = downsample(rsell, max_points)
+    rbuy = downsample(rbuy, max_points)
+
     datasets = [{
         'label': 'Sell volume',
         'borderColor': COLORS[0],
@@ -89,5 +160,9 @@ async def minutes_handler(request):
     return aiohttp_jinja2.render_template(
         'minutes.j2',
         request,
-        {'datasets': json.dumps(datasets)}
+        {
+            'datasets': json.dumps(datasets),
+            # rollups are not live, only minutes are appended
+            'live': table is MinutesTable
+        }
     )
@@ -0,0 +1,15 @@
+import os
+
+from aiohttp import web
+
+from vpa.db import pg_stats
+
+
+async def stats_handler(request):
+    cache = request.app['cache']
+    return web.json_response({
+        'pid': os.getpid(),
+        'cache': dict(cache.stats, size=len(cache)),
+        'live': request.app['live'].stats,
+        'pg': pg_stats(request.app['pg'])
+    })
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueue:
+    """
+    Bounded queue between sockets and fills handling, so socket reads do not wait on the database.
+    What happens when the queue is full depends on the policy:
+    block - the socket waits for a free slot,
+    spill - items go to an unbounded overflow list,
+    drop_oldest - the oldest queued item is dropped.
+    """
+
+    POLICIES = ('block', 'spill', 'drop_oldest')
+
+    def __init__(self, handler, maxsize, policy='spill', consumers=1):
+        if policy not in self.POLICIES:
+            raise ValueError("Unknown overflow policy: {}.".format(policy))
+        self.handler = handler
+        self.policy = policy
+        self.consumers = consumers
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._spill = deque()
+        self._tasks = []
+        self.stats = {
+            'put': 0,
+            'handled': 0,
+            'spilled': 0,
+            'dropped': 0,
+            'errors': 0,
+            'max_depth': 0,
+            'wait_time': 0,
+            'max_wait_time': 0
+        }
+
+    @property
+    def depth(self):
+        return self._queue.qsize() + len(self._spill)
+
+    async def put(self, **kwargs):
+        item = (time.monotonic(), kwargs)
+        self.stats['put'] += 1
+        if self.policy == 'block':
+            await self._queue.put(item)
+        elif self._spill or self._queue.full():
+            if self.policy == 'spill':
+                self._spill.append(item)
+                self.stats['spilled'] += 1
+            else:
+                self._queue.get_nowait()
+                self._queue.put_nowait(item)
+                self.stats['dropped'] += 1
+        else:
+            self._queue.put_nowait(item)
+        self.stats['max_depth'] = max(self.stats['max_depth'], self.depth)
+
+    async def _handle(self, item):
+        enqueued, kwargs = item
+        wait_time = time.monotonic() - enqueued
+        self.stats['wait_time'] += wait_time
+        self.stats['max_wait_time'] = max(self.stats['max_wait_time'], wait_time)
+        try:
+            await self.handler(**kwargs)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error("Error while handling fills: {}".format(e))
+        self.stats['handled'] += 1
+
+    async def _consume(self):
+        while True:
+            item = await self._queue.get()
+            while self._spill and not self._queue.full():
+                self._queue.put_nowait(self._spill.popleft())
+            await self._handle(item)
+
+    def start(self):
+        self._tasks = [asyncio.ensure_future(self._consume()) for _ in range(self.consumers)]
+
+    async def stop(self):
+        """
+        Stops consumers and handles what is left in the queue.
+        """
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        while not self._queue.empty():
+            await self._handle(self._queue.get_nowait())
+        while self._spill:
+            await self._handle(self._spill.popleft())
@@ -0,0 +1,165 @@
+import asyncio
+import datetime
+import logging
+import time
+
+import numpy
+import sqlalchemy as sa
+from sqlalchemy.sql import func
+
+from vpa.db.levels import LevelsTable
+from vpa.db.minutes import truncate
+from vpa.db.profile import RESOLUTION, ProfileTable, bin_rate, rate_bin
+from vpa.handlers.analysis import last_rate_query
+
+
+logger = logging.getLogger(__name__)
+
+SUPPORT = 'support'
+RESISTANCE = 'resistance'
+
+SMOOTH = 5  # bins, moving average width
+THRESHOLD = 1.5  # peak volume relative to the average bin volume
+MIN_DISTANCE = 10  # bins between levels
+
+
+def levels_profile_query(market, since, from_bin, to_bin):
+    return sa.select([
+        ProfileTable.c.bin,
+        func.sum(ProfileTable.c.volume).label('volume')
+    ]).where(
+        sa.and_(
+            ProfileTable.c.market == market,
+            ProfileTable.c.timestamp >= since,
+            ProfileTable.c.bin >= from_bin,
+            ProfileTable.c.bin <= to_bin
+        )
+    ).group_by(ProfileTable.c.bin)
+
+
+def market_levels_query(market):
+    return sa.select([
+        LevelsTable.c.timestamp,
+        LevelsTable.c.kind,
+        LevelsTable.c.rate,
+        LevelsTable.c.volume,
+        LevelsTable.c.share
+    ]).where(LevelsTable.c.market == market).order_by(LevelsTable.c.rate)
+
+
+def find_peaks(volume, max_levels, smooth=SMOOTH, threshold=THRESHOLD, min_distance=MIN_DISTANCE):
+    """
+    Positions of volume clusters in a volume per bin array, strongest first.
+    A cluster is a local maximum of the smoothed volume, at least `threshold` times the average,
+    weaker maxima closer than `min_distance` bins to a stronger one are skipped.
+    """
+    if len(volume) < 3 or not volume.any():
+        return numpy.array([], dtype=numpy.int64)
+    if len(volume) < smooth:
+        # 'same' returns max(len(volume), smooth) values, peaks of a longer array are shifted
+        smoothed = volume
+    else:
+        smoothed = numpy.convolve(volume, numpy.ones(smooth) / smooth, mode='same')
+    middle = smoothed[1:-1]
+    peaks = numpy.flatnonzero((middle > smoothed[:-2]) & (middle >= smoothed[2:])) + 1
+    peaks = peaks[smoothed[peaks] >= smoothed.mean() * threshold]
+    peaks = peaks[numpy.argsort(-smoothed[peaks], kind='mergesort')]
+
+    result = []
+    for peak in peaks:
+        if all(abs(peak - other) >= min_distance for other in result):
+            result.append(peak)
+            if len(result) == max_levels:
+                break
+    return numpy.array(result, dtype=numpy.int64)
+
+
+def find_levels(bins, volumes, last_rate, max_levels):
+    """
+    bins and volumes are volume_profile rows (any order), returns level dicts sorted by rate.
+    """
+    if not len(bins):
+        return []
+    first = bins.min()
+    dense = numpy.zeros(bins.max() - first + 1)
+    numpy.add.at(dense, bins - first, volumes)
+
+    total = dense.sum()
+    half = SMOOTH // 2
+    levels = []
+    for peak in find_peaks(dense, max_levels=max_levels):
+        rate = bin_rate(first + peak)
+        volume = dense[max(peak - half, 0):peak + half + 1].sum()
+        levels.append({
+            'kind': SUPPORT if rate <= last_rate else RESISTANCE,
+            'rate': rate,
+            'volume': float(volume),
+            'share': float(volume / total)
+        })
+    return sorted(levels, key=lambda i: i['rate'])
+
+
+class LevelsEngine:
+    """
+    Periodically finds support/resistance levels from the volume profile of each market
+    and replaces rows in the levels table.
+    """
+
+    def __init__(self, db_engine, markets, interval, period, spread, max_levels):
+        self.db_engine = db_engine
+        self.markets = markets
+        self.interval = interval
+        self.period = period
+        self.spread = spread
+        self.max_levels = max_levels
+        self.stats = {
+            'runs': 0,
+            'errors': 0,
+            'levels': 0,
+            'last_run_duration': 0
+        }
+
+    async def update(self, conn, market):
+        last_rate = await conn.scalar(last_rate_query(market=market))
+        if last_rate is None or last_rate <= 0:
+            return None
+        now = datetime.datetime.utcnow()
+        bins = []
+        volumes = []
+        async for row in conn.execute(levels_profile_query(
+                market=market,
+                since=truncate(now - datetime.timedelta(hours=self.period), RESOLUTION),
+                from_bin=rate_bin(last_rate * (1 - self.spread / 100)),
+                to_bin=rate_bin(last_rate * (1 + self.spread / 100)))):
+            bins.append(row.bin)
+            volumes.append(row.volume or 0)
+        levels = find_levels(
+            bins=numpy.array(bins, dtype=numpy.int64),
+            volumes=numpy.array(volumes, dtype=numpy.float64),
+            last_rate=last_rate,
+            max_levels=self.max_levels
+        )
+
+        async with conn.begin():
+            await conn.execute(LevelsTable.delete().where(LevelsTable.c.market == market))
+            if levels:
+                await conn.execute(LevelsTable.insert().values([
+                    dict(level, market=market, timestamp=now) for level in levels
+                ]))
+        return levels
+
+    async def run(self):
+        while True:
+            started = time.time()
+            found = 0
+            for market in self.markets:
+                try:
+                    async with self.db_engine.acquire() as conn:
+                        found += len(await self.update(conn=conn, market=market) or [])
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logger.error("{}: error while finding levels: {}".format(market, e))
+            self.stats['runs'] += 1
+            self.stats['levels'] = found
+            self.stats['last_run_duration'] = time.time() - started
+            await asyncio.sleep(self.interval)
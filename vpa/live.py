@@ -0,0 +1,178 @@
+import asyncio
+import datetime
+import json
+import logging
+
+import sqlalchemy as sa
+from aiohttp import WSCloseCode
+
+from vpa import settings
+from vpa.db.minutes import MinutesTable
+from vpa.db.trades import TradesTable
+
+
+logger = logging.getLogger(__name__)
+
+LAG = datetime.timedelta(seconds=10)  # fills can be committed later than newer ones
+
+
+def fills_query(market, since):
+    return sa.select([
+        TradesTable.c.trade_id,
+        TradesTable.c.order_type,
+        TradesTable.c.rate,
+        TradesTable.c.quantity,
+        TradesTable.c.timestamp
+    ]).where(
+        sa.and_(
+            TradesTable.c.market == market,
+            TradesTable.c.timestamp > since
+        )
+    ).order_by(TradesTable.c.timestamp)
+
+
+def live_minutes_query(market, since):
+    return sa.select([
+        MinutesTable.c.timestamp,
+        MinutesTable.c.vsell,
+        MinutesTable.c.vbuy,
+        MinutesTable.c.ratesell,
+        MinutesTable.c.ratebuy
+    ]).where(
+        sa.and_(
+            MinutesTable.c.market == market,
+            MinutesTable.c.timestamp >= since
+        )
+    ).order_by(MinutesTable.c.timestamp)
+
+
+class MarketFeed:
+    """
+    Polls new fills and changed minutes of a market and sends them to all subscribed websockets.
+    Messages: {"type": "fills" | "minutes", "data": [...]}.
+    """
+
+    def __init__(self, db_engine, market, interval):
+        self.db_engine = db_engine
+        self.market = market
+        self.interval = interval
+        self.clients = set()
+        self._sent_fills = {}  # trade_id: timestamp, within LAG
+        self._sent_minutes = {}  # timestamp: values
+        self._since = datetime.datetime.utcnow()
+        self._primed = False  # fills before the first poll are already on the page
+
+    async def _poll(self, conn):
+        fills = []
+        since = self._since - LAG
+        async for row in conn.execute(fills_query(market=self.market, since=since)):
+            if row.trade_id in self._sent_fills:
+                continue
+            self._sent_fills[row.trade_id] = row.timestamp
+            self._since = max(self._since, row.timestamp)
+            fills.append({
+                'order_type': row.order_type,
+                'rate': row.rate,
+                'quantity': row.quantity,
+                'timestamp': row.timestamp.isoformat()
+            })
+        since = self._since - LAG
+        self._sent_fills = {k: v for k, v in self._sent_fills.items() if v > since}
+        if not self._primed:
+            self._primed = True
+            fills = []
+
+        minutes = []
+        since = since.replace(second=0, microsecond=0)
+        async for row in conn.execute(live_minutes_query(market=self.market, since=since)):
+            values = (row.vsell, row.vbuy, row.ratesell, row.ratebuy)
+            if self._sent_minutes.get(row.timestamp) == values:
+                continue
+            self._sent_minutes[row.timestamp] = values
+            minutes.append({
+                'timestamp': row.timestamp.isoformat(),
+                'vsell': row.vsell,
+                'vbuy': row.vbuy,
+                'ratesell': row.ratesell,
+                'ratebuy': row.ratebuy
+            })
+        self._sent_minutes = {k: v for k, v in self._sent_minutes.items() if k >= since}
+        return fills, minutes
+
+    async def _send(self, ws, message):
+        try:
+            await ws.send_str(message)
+        except Exception:
+            self.clients.discard(ws)
+
+    async def broadcast(self, message_type, data):
+        # encoded once for all clients
+        message = json.dumps({'type': message_type, 'data': data})
+        await asyncio.gather(*[self._send(ws, message) for ws in list(self.clients)])
+
+    async def run(self):
+        while self.clients:
+            try:
+                async with self.db_engine.acquire() as conn:
+                    fills, minutes = await self._poll(conn)
+                if fills:
+                    await self.broadcast('fills', fills)
+                if minutes:
+                    await self.broadcast('minutes', minutes)
+            except Exception as e:
+                logger.error("{}: live feed error: {}".format(self.market, e))
+            await asyncio.sleep(self.interval)
+
+
+class LiveFeeds:
+    """
+    A feed per market while it has subscribers.
+    """
+
+    def __init__(self, db_engine, interval):
+        self.db_engine = db_engine
+        self.interval = interval
+        self.feeds = {}
+        self._tasks = {}
+
+    def subscribe(self, market, ws):
+        feed = self.feeds.get(market)
+        if feed is None or self._tasks[market].done():
+            feed = self.feeds[market] = MarketFeed(db_engine=self.db_engine, market=market, interval=self.interval)
+            feed.clients.add(ws)
+            self._tasks[market] = asyncio.ensure_future(feed.run())
+        else:
+            feed.clients.add(ws)
+
+    def unsubscribe(self, market, ws):
+        feed = self.feeds.get(market)
+        if feed is None:
+            return
+        feed.clients.discard(ws)
+        if not feed.clients:
+            self._tasks.pop(market).cancel()
+            del self.feeds[market]
+
+    @property
+    def stats(self):
+        return {
+            'feeds': len(self.feeds),
+            'clients': sum(len(feed.clients) for feed in self.feeds.values())
+        }
+
+    async def close(self):
+        for task in self._tasks.values():
+            task.cancel()
+        for feed in self.feeds.values():
+            for ws in list(feed.clients):
+                await ws.close(code=WSCloseCode.GOING_AWAY, message='Server shutdown')
+        self._tasks = {}
+        self.feeds = {}
+
+
+async def live_init(app):
+    app['live'] = LiveFeeds(db_engine=app['pg'], interval=settings.LIVE_POLL_INTERVAL)
+
+
+async def live_close(app):
+    await app['live'].close()
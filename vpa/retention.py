@@ -0,0 +1,13 @@
+from vpa.db import pg_engine
+from vpa.db.partitions import drop_partitions
+
+
+async def main(days):
+    db_engine = await pg_engine()
+    try:
+        async with db_engine.acquire() as conn:
+            for name in await drop_partitions(conn=conn, keep_days=days):
+                print("{} dropped.".format(name))
+    finally:
+        db_engine.close()
+        await db_engine.wait_closed()
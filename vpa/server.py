@@ -1,30 +1,159 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
 from aiohttp import web
 
 from vpa import settings
+from vpa.cache import ResponseCache, cached, latest_minute_query, latest_profile_query
 from vpa.db import pg_init, pg_close
 from vpa.handlers.analysis import analysis_handler
 from vpa.handlers.bubbles import bubbles_handler
 from vpa.handlers.export import export_handler
+from vpa.handlers.flow import flow_handler
 from vpa.handlers.index import index_handler
+from vpa.handlers.levels import levels_handler
+from vpa.handlers.live import live_handler
 from vpa.handlers.market import market_handler
 from vpa.handlers.minutes import minutes_handler
+from vpa.handlers.stats import stats_handler
+from vpa.live import live_init, live_close
 from vpa.utils import jinja_setup
 
 
-def main():
+logger = logging.getLogger(__name__)
+
+RESTART_DELAY = 1  # seconds, for workers that exit right after start
+
+
+def create_app():
     app = web.Application()
     app.on_startup.append(jinja_setup)
     app.on_startup.append(pg_init)
+    app.on_startup.append(live_init)
+    app.on_shutdown.append(live_close)
     app.on_cleanup.append(pg_close)
+    app['cache'] = ResponseCache(maxsize=settings.CACHE_SIZE, ttl=settings.CACHE_TTL)
 
     app.router.add_get('/', index_handler)
-    app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}', market_handler)
-    app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}/analysis', analysis_handler)
-    app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}/bubbles', bubbles_handler)
-    app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}/minutes', minutes_handler)
+    app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}', cached(market_handler))
+    app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}/analysis', cached(
+        analysis_handler, version_query=latest_profile_query
+    ))
+    app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}/bubbles', cached(bubbles_handler))
+    app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}/minutes', cached(
+        minutes_handler, version_query=latest_minute_query
+    ))
+    app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}/flow', cached(
+        flow_handler, version_query=latest_minute_query
+    ))
+    app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}/levels', levels_handler)
     app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}/export', export_handler)
+    app.router.add_get('/markets/{market:\w{2,5}-\w{2,5}}/live', live_handler)
+    app.router.add_get('/export', export_handler)
+    app.router.add_get('/stats', stats_handler)
 
     if settings.ENV == 'development':
         app.router.add_static('/logs', settings.LOGS_DIR)
 
-    web.run_app(app, port=int(settings.SERVER_PORT))
+    return app
+
+
+def parse_args(arguments):
+    parser = argparse.ArgumentParser(prog='manage.py server')
+    parser.add_argument('--workers', type=int, default=settings.SERVER_WORKERS, help="number of processes")
+    return parser.parse_args(arguments)
+
+
+def stop_worker(signum, frame):
+    # run_app handles KeyboardInterrupt as graceful shutdown (on_shutdown and on_cleanup are called)
+    raise KeyboardInterrupt()
+
+
+def worker(sock):
+    signal.signal(signal.SIGTERM, stop_worker)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    # the parent loop must not be shared with forked processes
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    web.run_app(create_app(), sock=sock, print=None)
+
+
+class Supervisor:
+    """
+    Pre-forks workers that accept connections on one inherited socket.
+    SIGTERM/SIGINT - graceful shutdown, SIGHUP - workers are replaced one by one,
+    workers that exit on their own are restarted.
+    """
+
+    def __init__(self, sock, workers):
+        self.sock = sock
+        self.workers = workers
+        self.processes = []
+        self._stopping = False
+        self._reload = False
+
+    def _spawn(self):
+        process = multiprocessing.Process(target=worker, args=(self.sock,))
+        process.start()
+        process.started = time.time()
+        logger.info("Worker {} started.".format(process.pid))
+        return process
+
+    def _stop(self, process):
+        process.terminate()
+        process.join()
+        logger.info("Worker {} stopped.".format(process.pid))
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_reload(self, signum, frame):
+        self._reload = True
+
+    def reload(self):
+        for i, process in enumerate(self.processes):
+            self.processes[i] = self._spawn()
+            self._stop(process)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        self.processes = [self._spawn() for _ in range(self.workers)]
+        try:
+            while not self._stopping:
+                time.sleep(0.5)
+                if self._reload:
+                    self._reload = False
+                    self.reload()
+                for i, process in enumerate(self.processes):
+                    if process.is_alive() or self._stopping:
+                        continue
+                    logger.error("Worker {} exited with code {}, restarting.".format(process.pid, process.exitcode))
+                    if time.time() - process.started < RESTART_DELAY:
+                        time.sleep(RESTART_DELAY)
+                    self.processes[i] = self._spawn()
+        finally:
+            for process in self.processes:
+                self._stop(process)
+            self.sock.close()
+
+
+def main(arguments=()):
+    args = parse_args(arguments)
+    if args.workers <= 1:
+        web.run_app(create_app(), port=int(settings.SERVER_PORT))
+        return
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('0.0.0.0', int(settings.SERVER_PORT)))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+    print("Serving on port {} with {} workers (pid {}).".format(settings.SERVER_PORT, args.workers, os.getpid()))
+    Supervisor(sock=sock, workers=args.workers).run()
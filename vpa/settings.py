@@ -9,7 +9,44 @@ PG_HOST = 'localhost'
 PG_USER = 'vpa'
 PG_PASSWORD = 'vpa'
 PG_DB = 'bittrex_vpa'
+PG_DSN = os.getenv('PG_DSN', '')  # overrides PG_* above
 
 ENV = os.getenv('ENV', 'development')
 LOGS_DIR = os.getenv('LOGS_DIR', rel('logs'))
 SERVER_PORT = os.getenv('SERVER_PORT', '8080')
+
+WRITER_BATCH_SIZE = int(os.getenv('WRITER_BATCH_SIZE', '500'))
+WRITER_FLUSH_INTERVAL = float(os.getenv('WRITER_FLUSH_INTERVAL', '1'))  # seconds
+WRITER_MAX_PENDING = int(os.getenv('WRITER_MAX_PENDING', '1000000'))  # rows kept while the database fails
+MINUTES_FLUSH_INTERVAL = float(os.getenv('MINUTES_FLUSH_INTERVAL', '10'))  # seconds
+PARTITIONS_AHEAD = int(os.getenv('PARTITIONS_AHEAD', '3'))  # days
+LATEST_TRADES_DAYS = int(os.getenv('LATEST_TRADES_DAYS', '3'))  # how far back "latest trades" queries look
+MINUTES_MIN_POINTS = int(os.getenv('MINUTES_MIN_POINTS', '200'))
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '5000'))  # rows per cursor fetch
+STATS_INTERVAL = float(os.getenv('STATS_INTERVAL', '60'))  # seconds
+SOCKET_SHARDS = int(os.getenv('SOCKET_SHARDS', '1'))  # websocket connections per watcher
+SOCKET_RECORD_FILE = os.getenv('SOCKET_RECORD_FILE', '')  # save raw socket frames for bench_decode
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', '10000'))  # socket messages
+INGEST_QUEUE_POLICY = os.getenv('INGEST_QUEUE_POLICY', 'spill')  # block, spill or drop_oldest
+INGEST_CONSUMERS = int(os.getenv('INGEST_CONSUMERS', '1'))
+CLOUDFLARE_COOKIE_TTL = int(os.getenv('CLOUDFLARE_COOKIE_TTL', '1800'))  # seconds
+BITTREX_SOCKET_URL = os.getenv('BITTREX_SOCKET_URL', 'https://socket.bittrex.com/signalr/')
+BITTREX_CLOUDFLARE = os.getenv('BITTREX_CLOUDFLARE', 'on') == 'on'  # off for vpa.benchmarks.signalr
+CACHE_SIZE = int(os.getenv('CACHE_SIZE', '1000'))  # cached responses
+CACHE_TTL = float(os.getenv('CACHE_TTL', '30'))  # seconds
+LIVE_POLL_INTERVAL = float(os.getenv('LIVE_POLL_INTERVAL', '1'))  # seconds, a query per market with live clients
+MAX_POINTS = int(os.getenv('MAX_POINTS', '1000'))  # per chart dataset, see vpa.downsample
+CHART_TRADES_MAX = int(os.getenv('CHART_TRADES_MAX', '5000'))  # `trades` param limit of market and bubbles pages
+LEVELS_INTERVAL = float(os.getenv('LEVELS_INTERVAL', '300'))  # seconds between support/resistance updates
+LEVELS_PERIOD = int(os.getenv('LEVELS_PERIOD', '168'))  # hours of volume profile
+LEVELS_SPREAD = float(os.getenv('LEVELS_SPREAD', '20'))  # % around the last rate
+LEVELS_MAX = int(os.getenv('LEVELS_MAX', '10'))  # per market
+SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', '1'))  # processes sharing SERVER_PORT
+PG_POOL_MIN = int(os.getenv('PG_POOL_MIN', '1'))  # connections per server process
+PG_POOL_MAX = int(os.getenv('PG_POOL_MAX', '10'))
+PG_STATEMENT_TIMEOUT = int(os.getenv('PG_STATEMENT_TIMEOUT', '30000'))  # ms, server queries, 0 - no limit
+PG_PREPARED = os.getenv('PG_PREPARED', 'on') == 'on'  # off behind pgbouncer in transaction pooling mode
+WATCHER_PG_DSN = os.getenv('WATCHER_PG_DSN', '')  # PG_DSN if empty
+WATCHER_PG_POOL_MIN = int(os.getenv('WATCHER_PG_POOL_MIN', '1'))
+WATCHER_PG_POOL_MAX = int(os.getenv('WATCHER_PG_POOL_MAX', '10'))
+WATCHER_PG_STATEMENT_TIMEOUT = int(os.getenv('WATCHER_PG_STATEMENT_TIMEOUT', '0'))  # ms
@@ -1,152 +1,202 @@
+import argparse
 import asyncio
-import datetime
-from collections import defaultdict
+import logging
 from functools import partial
 
-import dateutil.parser
-import sqlalchemy as sa
-from aiopg.sa import create_engine
-
 from vpa import settings
-from vpa.bittrex import BittrexTradesSocket
-from vpa.db.minutes import MinutesTable
+from vpa.aggregator import MinutesAggregator, ProfileAggregator
+from vpa.bittrex import BittrexShardedSocket, get_markets
+from vpa.bl import StrategiesRunner
+from vpa.db import pg_engine, pg_stats
+from vpa.db.decisions import DecisionsTable
+from vpa.db.partitions import create_partitions
 from vpa.db.trades import TradesTable
+from vpa.decode import Fill
+from vpa.ingest import IngestQueue
+from vpa.levels import LevelsEngine
+from vpa.writer import BatchWriter
 
 
-async def on_trades(market, trades, db_engine):
-    async with db_engine.acquire() as conn:
-        for trade in trades:
-            await conn.execute(TradesTable.insert().values(
-                market=market,
-                order_type=trade['OrderType'],
-                rate=trade['Rate'],
-                quantity=trade['Quantity'],
-                timestamp=dateutil.parser.parse(trade['TimeStamp'])
-            )
-        )
+logger = logging.getLogger(__name__)
 
 
-async def minutes_dump(db_engine):
+async def on_trades(market, trades, trades_writer, minutes_aggregator, profile_aggregator,
+                    strategies_runner=None, decisions_writer=None):
     """
-    Count last 2 minutes, update db.
+    trades are vpa.decode.Fill tuples.
+    """
+    decisions = []
+    for fill in trades:
+        minutes_aggregator.add(*fill)
+        profile_aggregator.add(*fill)
+        if strategies_runner:
+            decisions.extend(strategies_runner.add_trade(*fill))
+    await trades_writer.add(trades)
+    if decisions:
+        await decisions_writer.add(decisions)
+
+
+async def partitions_maintain(db_engine):
+    """
+    Makes sure trades partitions exist for the next days.
     """
     while True:
-        await asyncio.sleep(10)
-        current_markets = defaultdict(lambda: {
-            'vsell': 0,
-            'vbuy': 0,
-            'nsell': 0,
-            'nbuy': 0,
-            'ratesell': None,
-            'ratebuy': None
-        })
-        previous_markets = defaultdict(lambda: {
-            'vsell': 0,
-            'vbuy': 0,
-            'nsell': 0,
-            'nbuy': 0,
-            'ratesell': None,
-            'ratebuy': None
-        })
-        async with db_engine.acquire() as conn:
-            current_minute = datetime.datetime.utcnow().replace(second=0, microsecond=0)
-            previous_minute = current_minute - datetime.timedelta(minutes=1)
-            next_minute = current_minute + datetime.timedelta(minutes=1)
-            async for row in conn.execute(
-                    TradesTable.select().where(
-                        sa.and_(
-                            TradesTable.c.timestamp >= current_minute,
-                            TradesTable.c.timestamp < next_minute
-                        )
-                    ).order_by(sa.asc(TradesTable.c.timestamp))):
-                current_market = current_markets[row.market]
-                if row.order_type == 'BUY':
-                    current_market['vbuy'] += row.quantity
-                    current_market['nbuy'] += 1
-                    current_market['ratebuy'] = row.rate
-                elif row.order_type == 'SELL':
-                    current_market['vsell'] += row.quantity
-                    current_market['nsell'] += 1
-                    current_market['ratesell'] = row.rate
-            async for row in conn.execute(
-                    TradesTable.select().where(
-                        sa.and_(
-                            TradesTable.c.timestamp >= previous_minute,
-                            TradesTable.c.timestamp < current_minute
-                        )
-                    ).order_by(sa.asc(TradesTable.c.timestamp))):
-                previous_market = previous_markets[row.market]
-                if row.order_type == 'BUY':
-                    previous_market['vbuy'] += row.quantity
-                    previous_market['nbuy'] += 1
-                    previous_market['ratebuy'] = row.rate
-                elif row.order_type == 'SELL':
-                    previous_market['vsell'] += row.quantity
-                    previous_market['nsell'] += 1
-                    previous_market['ratesell'] = row.rate
-
-            if not current_markets and not previous_markets:
-                continue
-
-            existing = []
-            async for row in conn.execute(
-                    MinutesTable.select().where(
-                        sa.and_(
-                            TradesTable.c.timestamp >= previous_minute,
-                            TradesTable.c.timestamp < next_minute
-                        )
-                    )):
-                existing.append((row.market, row.timestamp))
-
-            for markets, timestamp in ((current_markets, current_minute), (previous_markets, previous_minute)):
-                for market, minute in markets.items():
-                    if (market, timestamp) in existing:
-                        await conn.execute(MinutesTable.update().values(
-                            vsell=minute['vsell'],
-                            vbuy=minute['vbuy'],
-                            nsell=minute['nsell'],
-                            nbuy=minute['nbuy'],
-                            ratesell=minute['ratesell'],
-                            ratebuy=minute['ratebuy']
-                        ).where(
-                            sa.and_(
-                                MinutesTable.c.market == market,
-                                MinutesTable.c.timestamp == timestamp
-                            )
-                        ))
-                    else:
-                        await conn.execute(MinutesTable.insert().values(
-                            market=market,
-                            timestamp=timestamp,
-                            vsell=minute['vsell'],
-                            vbuy=minute['vbuy'],
-                            nsell=minute['nsell'],
-                            nbuy=minute['nbuy'],
-                            ratesell=minute['ratesell'],
-                            ratebuy=minute['ratebuy']
-                        ))
-
-
-async def main(markets):
-    db_engine = await create_engine(
-        dsn='dbname={db} user={user} password={password} host={host}'.format(
-            db=settings.PG_DB,
-            user=settings.PG_USER,
-            password=settings.PG_PASSWORD,
-            host=settings.PG_HOST
+        try:
+            async with db_engine.acquire() as conn:
+                await create_partitions(conn=conn, days=settings.PARTITIONS_AHEAD)
+        except Exception as e:
+            logger.error("Error while creating partitions: {}".format(e))
+        await asyncio.sleep(3600)
+
+
+async def stats_log(db_engine, trades_socket, ingest_queue, trades_writer, levels_engine, strategies_runner=None):
+    messages = {}
+    while True:
+        await asyncio.sleep(settings.STATS_INTERVAL)
+        for health in trades_socket.health():
+            logger.info("{name}: {tickers} tickers, connected: {connected}, idle: {idle}s, "
+                        "{rate:.1f} msg/s, {fills} fills, {errors} errors, {reconnects} reconnects, "
+                        "connect time: {connect_time}s (max {max_connect_time}s)".format(
+                rate=(health['messages'] - messages.get(health['name'], 0)) / settings.STATS_INTERVAL,
+                **health
+            ))
+            messages[health['name']] = health['messages']
+        stats = ingest_queue.stats
+        logger.info("Ingest queue: depth {depth} (max {max_depth}), {spilled} spilled, {dropped} dropped, "
+                    "{wait:.3f}ms avg wait, {max_wait:.3f}ms max wait".format(
+            depth=ingest_queue.depth,
+            wait=stats['wait_time'] / stats['handled'] * 1000 if stats['handled'] else 0,
+            max_wait=stats['max_wait_time'] * 1000,
+            **stats
+        ))
+        logger.info("Trades writer: {}".format(trades_writer.stats))
+        logger.info("Postgres: {}".format(pg_stats(db_engine)))
+        logger.info("Levels: {}".format(levels_engine.stats))
+        if strategies_runner:
+            stats = strategies_runner.stats
+            logger.info("Strategies: {} trades, {} decisions, {:.3f}ms avg, {:.3f}ms max".format(
+                stats['trades'],
+                stats['decisions'],
+                stats['time'] / stats['trades'] * 1000 if stats['trades'] else 0,
+                stats['max_time'] * 1000
+            ))
+
+
+def parse_args(arguments):
+    parser = argparse.ArgumentParser(prog='manage.py watch')
+    parser.add_argument('markets', help="comma separated, e.g. BTC-ETH,BTC-LTC or BTC-*,USDT-*")
+    parser.add_argument('--strategies', default='', help="comma separated strategy names, e.g. pump,trailing_stop")
+    parser.add_argument('--shards', type=int, default=settings.SOCKET_SHARDS, help="number of socket connections")
+    return parser.parse_args(arguments)
+
+
+async def main(markets, strategies=(), shards=1):
+    if any('*' in market for market in markets):
+        markets = await get_markets(patterns=markets)
+        logger.info("Watching {} markets.".format(len(markets)))
+
+    db_engine = await pg_engine(
+        dsn=settings.WATCHER_PG_DSN,
+        minsize=settings.WATCHER_PG_POOL_MIN,
+        maxsize=settings.WATCHER_PG_POOL_MAX,
+        statement_timeout=settings.WATCHER_PG_STATEMENT_TIMEOUT
+    )
+
+    trades_writer = BatchWriter(
+        db_engine=db_engine,
+        table=TradesTable,
+        columns=Fill._fields,
+        batch_size=settings.WRITER_BATCH_SIZE,
+        flush_interval=settings.WRITER_FLUSH_INTERVAL,
+        max_pending=settings.WRITER_MAX_PENDING
+    )
+
+    minutes_aggregator = MinutesAggregator(
+        db_engine=db_engine,
+        flush_interval=settings.MINUTES_FLUSH_INTERVAL
+    )
+
+    profile_aggregator = ProfileAggregator(
+        db_engine=db_engine,
+        flush_interval=settings.MINUTES_FLUSH_INTERVAL
+    )
+
+    strategies_runner = None
+    decisions_writer = None
+    tasks = []
+    if strategies:
+        strategies_runner = StrategiesRunner(strategies=strategies)
+        decisions_writer = BatchWriter(
+            db_engine=db_engine,
+            table=DecisionsTable,
+            batch_size=settings.WRITER_BATCH_SIZE,
+            flush_interval=settings.WRITER_FLUSH_INTERVAL,
+            max_pending=settings.WRITER_MAX_PENDING
         )
+        tasks.append(asyncio.ensure_future(decisions_writer.run()))
+
+    ingest_queue = IngestQueue(
+        handler=partial(
+            on_trades,
+            trades_writer=trades_writer,
+            minutes_aggregator=minutes_aggregator,
+            profile_aggregator=profile_aggregator,
+            strategies_runner=strategies_runner,
+            decisions_writer=decisions_writer
+        ),
+        maxsize=settings.INGEST_QUEUE_SIZE,
+        policy=settings.INGEST_QUEUE_POLICY,
+        consumers=settings.INGEST_CONSUMERS
     )
 
-    trades_socket = BittrexTradesSocket(
+    record = open(settings.SOCKET_RECORD_FILE, 'a') if settings.SOCKET_RECORD_FILE else None
+
+    trades_socket = BittrexShardedSocket(
         tickers=markets,
-        on_trades=partial(on_trades, db_engine=db_engine)
+        shards=shards,
+        record=record,
+        on_trades=ingest_queue.put
     )
 
-    minutes_task = asyncio.ensure_future(minutes_dump(db_engine=db_engine))
+    ingest_queue.start()
+
+    tasks.append(asyncio.ensure_future(partitions_maintain(db_engine=db_engine)))
+    tasks.append(asyncio.ensure_future(trades_writer.run()))
+    tasks.append(asyncio.ensure_future(minutes_aggregator.run()))
+    tasks.append(asyncio.ensure_future(profile_aggregator.run()))
+    levels_engine = LevelsEngine(
+        db_engine=db_engine,
+        markets=markets,
+        interval=settings.LEVELS_INTERVAL,
+        period=settings.LEVELS_PERIOD,
+        spread=settings.LEVELS_SPREAD,
+        max_levels=settings.LEVELS_MAX
+    )
+    tasks.append(asyncio.ensure_future(levels_engine.run()))
+    tasks.append(asyncio.ensure_future(stats_log(
+        db_engine=db_engine,
+        trades_socket=trades_socket,
+        ingest_queue=ingest_queue,
+        trades_writer=trades_writer,
+        levels_engine=levels_engine,
+        strategies_runner=strategies_runner
+    )))
 
     try:
         await trades_socket.run()
     finally:
-        minutes_task.cancel()
+        for task in tasks:
+            task.cancel()
+        # a cancelled flush puts its rows back, wait for that before the final flushes
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await trades_socket.stop()
+        await ingest_queue.stop()
+        await trades_writer.flush()
+        await minutes_aggregator.flush()
+        await profile_aggregator.flush()
+        if decisions_writer:
+            await decisions_writer.flush()
+        if record:
+            record.close()
         db_engine.close()
         await db_engine.wait_closed()
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy.dialects import postgresql
+
+from vpa.db.prepared import PreparedStatement
+
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """
+    Collects rows in memory and writes them with multi-row INSERTs.
+    Flush happens when batch_size rows are pending or every flush_interval seconds.
+    Rows are dicts, or tuples of values in `columns` order if columns are given.
+    With columns, a batch is one prepared INSERT ... SELECT FROM unnest() of a value array per column.
+    A flush is one transaction, rows of a failed flush are kept for the next one,
+    when more than max_pending rows are pending the oldest are dropped.
+    """
+
+    def __init__(self, db_engine, table, batch_size, flush_interval, columns=None, max_pending=None):
+        self.db_engine = db_engine
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.columns = columns
+        self.max_pending = max_pending
+        self._statement = self._prepare() if columns else None
+        self._rows = []
+        self._lock = asyncio.Lock()
+        self.stats = {
+            'flushes': 0,
+            'rows': 0,
+            'last_flush_rows': 0,
+            'last_flush_duration': 0,
+            'max_flush_rows': 0,
+            'dropped': 0
+        }
+
+    def _prepare(self):
+        dialect = postgresql.dialect()
+        return PreparedStatement(
+            'insert_{}'.format(self.table.name),
+            'INSERT INTO {table} ({columns}) SELECT * FROM unnest({arrays})'.format(
+                table=self.table.name,
+                columns=', '.join('"{}"'.format(column) for column in self.columns),
+                arrays=', '.join(
+                    '%({})s::{}[]'.format(column, self.table.c[column].type.compile(dialect=dialect))
+                    for column in self.columns
+                )
+            )
+        )
+
+    async def _insert(self, conn, rows):
+        if self.columns:
+            await self._statement.execute(conn, **{
+                column: list(values) for column, values in zip(self.columns, zip(*rows))
+            })
+        else:
+            await conn.execute(self.table.insert().values(rows))
+
+    @property
+    def pending(self):
+        return len(self._rows)
+
+    def _trim(self):
+        if self.max_pending and len(self._rows) > self.max_pending:
+            dropped = len(self._rows) - self.max_pending
+            del self._rows[:dropped]
+            self.stats['dropped'] += dropped
+            logger.warning("{}: {} oldest pending rows dropped.".format(self.table.name, dropped))
+
+    async def add(self, rows):
+        self._rows.extend(rows)
+        self._trim()
+        if len(self._rows) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._rows:
+                return
+            rows, self._rows = self._rows, []
+            started = time.time()
+            written = False
+            try:
+                async with self.db_engine.acquire() as conn:
+                    async with conn.begin():
+                        for i in range(0, len(rows), self.batch_size):
+                            await self._insert(conn, rows[i:i + self.batch_size])
+                    written = True
+            finally:
+                if not written:
+                    # error or cancellation, nothing is written, keep rows for the next attempt
+                    self._rows = rows + self._rows
+                    self._trim()
+
+            duration = time.time() - started
+            self.stats['flushes'] += 1
+            self.stats['rows'] += len(rows)
+            self.stats['last_flush_rows'] = len(rows)
+            self.stats['last_flush_duration'] = duration
+            self.stats['max_flush_rows'] = max(self.stats['max_flush_rows'], len(rows))
+            logger.info("{table}: {rows} rows written in {duration:.3f}s (total {total}).".format(
+                table=self.table.name,
+                rows=len(rows),
+                duration=duration,
+                total=self.stats['rows']
+            ))
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Error while writing {}: {}".format(self.table.name, e))